@@ -0,0 +1,51 @@
+import concurrent.futures
+import importlib.util
+import os
+import py_compile
+import struct
+
+from typing import Iterable, List, Tuple
+
+
+def _cache_path(path: str, optimize: int) -> str:
+    return importlib.util.cache_from_source(path, optimization=optimize if optimize else "")
+
+
+def is_bytecode_current(path: str, optimize: int) -> bool:
+    """Whether the cached bytecode of path matches its mtime and size, the same check as compileall"""
+    try:
+        st = os.stat(path)
+        with open(_cache_path(path, optimize), "rb") as fp:
+            header = fp.read(16)
+    except OSError:
+        return False
+    mtime, size = int(st.st_mtime) & 0xFFFFFFFF, st.st_size & 0xFFFFFFFF
+    expected = struct.pack("<4sLLL", importlib.util.MAGIC_NUMBER, 0, mtime, size)
+    return header == expected
+
+
+def _compile(task: Tuple[str, int]) -> None:
+    path, optimize = task
+    py_compile.compile(path, cfile=_cache_path(path, optimize), doraise=True, optimize=optimize)
+
+
+def compile_bytecode(paths: Iterable[str], optimize_levels: Iterable[int] = (0,), jobs: int = 1) -> int:
+    """Write the __pycache__ entries of paths for each optimization level, return the number written
+
+    Entries which are up to date are skipped, so unchanged generated files cost only a stat.
+    """
+    tasks: List[Tuple[str, int]] = [
+        (path, optimize)
+        for path in paths
+        for optimize in sorted(set(optimize_levels))
+        if not is_bytecode_current(path, optimize)
+    ]
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            list(executor.map(_compile, tasks))
+    else:
+        for task in tasks:
+            _compile(task)
+    return len(tasks)
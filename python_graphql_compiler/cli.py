@@ -1,34 +1,33 @@
 import collections.abc
+import concurrent.futures
 import copy
-import glob
+import functools
+import itertools
 import json
 import os
+import stat
 
-from collections import defaultdict
-from typing import Dict, List, Optional, Set
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import click
 
-try:
-    import requests
-except ImportError:
-    pass
-
-import yaml
+import python_graphql_compiler
 
-from graphql import GraphQLSchema, build_ast_schema, get_introspection_query, validate
-from graphql.language import OperationDefinitionNode
-from graphql.language.parser import parse
-from graphql.utilities.print_schema import print_schema
-from graphql.validation.rules.no_unused_fragments import NoUnusedFragmentsRule
-from graphql.validation.specified_rules import specified_rules
+from . import bytecode
+from .depfile import write_depfile
+from .discovery import find_query_files
+from .files import atomic_write
+from .types import Config, ProjectConfig
 
-import python_graphql_compiler
+# graphql, requests and yaml are imported where they are used so that --help, --version and small runs
+# do not pay for them
+if TYPE_CHECKING:  # pragma: no cover
+    from graphql import DocumentNode, GraphQLSchema, IntrospectionQuery
 
-from .parser import Parser
-from .renderer import Renderer
-from .types import Config
-from .utils import build_client_schema
+    from .compiler import Compiler
+    from .introspection import IntrospectionOptions
+    from .parser import ParsedQuery
+    from .stats import Stats
 
 DEFAULT_CONFIG: Config = {
     "output_path": "{dirname}/{basename_without_ext}.py",
@@ -59,6 +58,9 @@ DEFAULT_CONFIG: Config = {
         },
     },
     "query_ext": "graphql",
+    "exclude": ["node_modules", "__pycache__"],
+    "gitignore": False,
+    "validation": "full",
     "inherit": [],
     "python_version": "3.10",
 }
@@ -73,97 +75,426 @@ def _dict_update(d, u):
     return d
 
 
+def get_output_path(filename: str, config: Config) -> str:
+    dirname = os.path.dirname(filename)
+    basename = os.path.basename(filename)
+    basename_without_ext, ext = os.path.splitext(basename)
+    return config["output_path"].format(
+        dirname=dirname,
+        basename=basename,
+        basename_without_ext=basename_without_ext,
+        ext=ext,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _default_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_if_changed(path: str, content: str) -> bool:
+    """Atomically replace path with content unless it already has that content, return whether it changed
+
+    Unchanged files keep their mtime, so that bytecode, mypy and build caches stay valid.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            if fp.read() == content:
+                return False
+        mode: Optional[int] = stat.S_IMODE(os.stat(path).st_mode)
+    except (OSError, UnicodeDecodeError):
+        mode = None
+
+    # new files get the default permissions instead of the 0600 of the temporary file
+    atomic_write(path, content.encode("utf-8"), mode=_default_mode() if mode is None else mode)
+    return True
+
+
+def write_outputs(filename: str, rendered_list: List[str], targets: List[Config]) -> Tuple[List[str], int]:
+    """Write the output of each target, return the output paths and the number of files which changed"""
+    outputs: List[str] = []
+    changed = 0
+    for target, rendered in zip(targets, rendered_list):
+        if not target.get("output_path"):
+            continue
+        dst_path = get_output_path(filename, target)
+        changed += write_if_changed(dst_path, rendered + "\n")
+        outputs.append(dst_path)
+    return outputs, changed
+
+
+READ_AHEAD = 4
+
+
+_worker_compiler: Optional["Compiler"] = None
+
+
+def _init_worker(schema: "GraphQLSchema", config: Config, validation_cache: Optional[str]) -> None:
+    from .compiler import Compiler  # pylint: disable=import-outside-toplevel
+
+    global _worker_compiler  # pylint: disable=global-statement
+    _worker_compiler = Compiler(schema, config, validation_cache=validation_cache)
+
+
+def _compile_in_worker(query_str: str) -> Optional[List[str]]:
+    assert _worker_compiler
+    return _worker_compiler.compile_targets(query_str)
+
+
+def _read(filename: str) -> str:
+    with open(filename, "r", encoding="utf-8") as fp:
+        return fp.read()
+
+
+def _read_ahead(
+    filenames: Iterable[str], depth: int = READ_AHEAD, stats: Optional["Stats"] = None
+) -> Iterator[Tuple[str, str]]:
+    """Yield (filename, content) while the following files are read in a background thread"""
+    from .stats import phase  # pylint: disable=import-outside-toplevel
+
+    it = iter(filenames)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        pending = collections.deque(
+            (filename, executor.submit(_read, filename)) for filename in itertools.islice(it, depth)
+        )
+        while pending:
+            filename, future = pending.popleft()
+            for next_filename in itertools.islice(it, 1):
+                pending.append((next_filename, executor.submit(_read, next_filename)))
+            if stats:
+                stats.current_file = filename
+            with phase(stats, "read"):
+                query_str = future.result()
+            yield filename, query_str
+
+
+_Compiled = Tuple[str, str, Optional[List[str]]]
+
+
+def _compile_serial(compiler: "Compiler", sources: Iterable[Tuple[str, str]]) -> Iterator[_Compiled]:
+    for filename, query_str in sources:
+        yield filename, query_str, compiler.compile_targets(query_str)
+
+
+def _compile_parallel(
+    schema: "GraphQLSchema",
+    config: Config,
+    sources: Iterable[Tuple[str, str]],
+    jobs: int,
+    validation_cache: Optional[str] = None,
+) -> Iterator[_Compiled]:
+    # a few files per worker are in flight, so that workers are kept busy without holding the whole corpus
+    pending: Deque[Tuple[str, str, "concurrent.futures.Future[Optional[List[str]]]"]] = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(schema, config, validation_cache)
+    ) as executor:
+        for filename, query_str in sources:
+            pending.append((filename, query_str, executor.submit(_compile_in_worker, query_str)))
+            if len(pending) >= jobs * 2:
+                filename, query_str, future = pending.popleft()
+                yield filename, query_str, future.result()
+        while pending:
+            filename, query_str, future = pending.popleft()
+            yield filename, query_str, future.result()
+
+
 def run(
-    schema: GraphQLSchema,
+    schema: "GraphQLSchema",
     query_files: List[str],
     config: Config,
-) -> None:
-    query_parser = Parser(schema)
-    query_renderer = Renderer(
-        scalar_map=config["scalar_map"],
-        inherit=config["inherit"],
-        python_version=config["python_version"],
+    manifest_path: Optional[str] = None,
+    jobs: int = 1,
+    documents: Optional[Dict[str, List["ParsedQuery"]]] = None,
+    stats: Optional["Stats"] = None,
+    validation_cache: Optional[str] = None,
+) -> int:
+    """Compile query files one at a time from reading to writing, memory does not grow with the corpus
+
+    Returns the number of output files whose content changed. documents, shared between runs with the same
+    schema, keeps parsed documents so that they are validated and parsed only once (serial runs only). With
+    stats, the time and memory of each phase are recorded and files are compiled in this process. Validation
+    results are kept in the validation_cache directory.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .compiler import Compiler, target_configs
+    from .manifest import Manifest
+    from .stats import phase
+
+    targets = target_configs(config)
+    manifest: Optional[Manifest] = None
+    if manifest_path:
+        manifest = Manifest.load(manifest_path, schema, config)
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = 1 if stats else min(jobs, len(query_files))
+    if jobs > 1:
+        # the largest files are submitted first so that they do not end up as the tail of the run
+        query_files = sorted(query_files, key=os.path.getsize, reverse=True)
+
+    # files whose manifest entry matches the current schema and config
+    checked: Set[str] = set()
+
+    def is_up_to_date(filename: str, query_str: str) -> bool:
+        with phase(stats, "manifest"):
+            if manifest and manifest.is_up_to_date(filename, query_str):
+                checked.add(filename)
+                return True
+            return False
+
+    sources = (
+        (filename, query_str)
+        for filename, query_str in _read_ahead(query_files, stats=stats)
+        if not is_up_to_date(filename, query_str)
     )
+    if jobs > 1:
+        results = _compile_parallel(schema, config, sources, jobs, validation_cache=validation_cache)
+    else:
+        compiler = Compiler(
+            schema, config, documents=documents, stats=stats, validation_cache=validation_cache
+        )
+        results = _compile_serial(compiler, sources)
 
-    operation_library: Dict[str, List[OperationDefinitionNode]] = defaultdict(list)
-    # fragment_library: Dict[str, List[FragmentDefinitionNode]] = defaultdict(list)
+    changed = 0
+    completed = False
+    try:
+        for filename, query_str, rendered_list in results:
+            if rendered_list is None:
+                continue
+            with phase(stats, "write"):
+                outputs, written = write_outputs(filename, rendered_list, targets)
+            changed += written
+            if manifest and outputs:
+                with phase(stats, "manifest"):
+                    manifest.update(filename, query_str, outputs)
+                    checked.add(filename)
+            if stats:
+                for target, rendered in zip(targets, rendered_list):
+                    if target.get("output_path"):
+                        stats.add_output(filename, get_output_path(filename, target), rendered + "\n")
+        completed = True
+    finally:
+        # files written before a failure are recorded as well, the entries of the files which were not
+        # reached are dropped since their fingerprints do not match the schema and config saved with them
+        if manifest:
+            with phase(stats, "manifest"):
+                manifest.retain(query_files if completed else checked)
+                manifest.save()
+        if stats:
+            stats.current_file = None
+    return changed
 
-    rules = [rule for rule in specified_rules if rule is not NoUnusedFragmentsRule]
-    for filename in query_files:
-        with open(filename, "r", encoding="utf-8") as fp:
-            parsed_query = parse(fp.read())
-        errors = validate(schema, parsed_query, rules)
-        if errors:
-            raise Exception(errors)
-        for definition in parsed_query.definitions:
-            if isinstance(definition, OperationDefinitionNode):
-                assert definition.name
-                operation_library[filename].append(definition)
-            else:
-                raise Exception("Unsupported type found")
-            # elif isinstance(definition, FragmentDefinitionNode):
-            #     assert definition.name
-            #     fragment_library[filename].append(definition)
-
-    for filename, definition_list in operation_library.items():
-        parsed_list = [query_parser.parse(definition) for definition in definition_list]
-
-        if config.get("output_path"):
-            dirname = os.path.dirname(filename)
-            basename = os.path.basename(filename)
-            basename_without_ext, ext = os.path.splitext(basename)
-            dst_path = config["output_path"].format(
-                dirname=dirname,
-                basename=basename,
-                basename_without_ext=basename_without_ext,
-                ext=ext,
-            )
-            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-            with open(dst_path, "w", encoding="utf-8") as fp:
-                print(query_renderer.render(parsed_list), file=fp)
+
+def _build_schema(
+    sdl_sources: List[Tuple[str, str]],
+    introspections: List["IntrospectionQuery"],
+    assume_valid: bool,
+    cache_dir: Optional[str],
+) -> "GraphQLSchema":
+    # pylint: disable=import-outside-toplevel
+    from graphql import build_ast_schema, extend_schema
+
+    from .introspection import merge_introspections
+    from .schema_cache import merge_documents, parse_schema_document
+    from .utils import build_client_schema
+
+    documents = [
+        parse_schema_document(content_hash, content, cache_dir=cache_dir)
+        for content_hash, content in sdl_sources
+    ]
+    if not introspections:
+        return build_ast_schema(merge_documents(documents), assume_valid=assume_valid)
+
+    # introspection results are used as they are, SDL files are applied on top of them
+    schema = build_client_schema(merge_introspections(introspections))
+    if documents:
+        schema = extend_schema(schema, merge_documents(documents), assume_valid=assume_valid)
+    return schema
 
 
-def compile_schema_library(schema_filepaths: Optional[List[str]]) -> GraphQLSchema:
+def compile_schema_library(
+    schema_filepaths: Optional[List[str]],
+    cache_dir: Optional[str] = None,
+    assume_valid: bool = False,
+    introspection: Optional["IntrospectionOptions"] = None,
+) -> "GraphQLSchema":
+    # pylint: disable=import-outside-toplevel
+    from .introspection import fetch_introspections, load_introspection_file
+    from .schema_cache import load_schema_snapshot, save_schema_snapshot, schema_cache_key
+    from .utils import hash_content
+
     if not schema_filepaths:
         raise Exception("schema must be required")
 
-    full_schema = ""
+    urls = [schema_filepath for schema_filepath in schema_filepaths if schema_filepath.startswith("http")]
+    fetched = dict(zip(urls, fetch_introspections(urls, introspection)))
+
+    sdl_sources: List[Tuple[str, str]] = []
+    introspections: List["IntrospectionQuery"] = []
     for schema_filepath in schema_filepaths:
         if schema_filepath.startswith("http"):
-            if "requests" not in globals():
-                raise Exception('schema from network unsupported. install "requests"')
-
-            res = requests.post(
-                schema_filepath,
-                headers={"Content-Type": "application/json"},
-                data=json.dumps({"query": get_introspection_query()}),
-            )
-            res.raise_for_status()
-            full_schema = full_schema + print_schema(build_client_schema(res.json()["data"]))
+            introspections.append(fetched[schema_filepath])
+        elif schema_filepath.endswith(".json"):
+            introspections.append(load_introspection_file(schema_filepath))
         else:
             with open(schema_filepath, "r", encoding="utf-8") as schema_file:
-                full_schema = full_schema + schema_file.read()
+                content = schema_file.read()
+            sdl_sources.append((hash_content(content), content))
+
+    if not cache_dir:
+        return _build_schema(sdl_sources, introspections, assume_valid, cache_dir)
+
+    key_source = "\0".join(content_hash for content_hash, _ in sdl_sources)
+    if introspections:
+        key_source = key_source + "\0" + json.dumps(introspections, sort_keys=True)
+    key = schema_cache_key(key_source)
+    schema = load_schema_snapshot(cache_dir, key, assume_valid=assume_valid)
+    if schema is None:
+        schema = _build_schema(sdl_sources, introspections, assume_valid, cache_dir)
+        save_schema_snapshot(cache_dir, key, schema)
+    return schema
+
+
+def collect_dependencies(
+    query_files: List[str], schema_filepaths: List[str], config_files: List[str], config: Config
+) -> Dict[str, List[str]]:
+    shared = [path for path in schema_filepaths if not path.startswith("http")] + list(config_files)
+    dependencies: Dict[str, List[str]] = {}
+    for filename in sorted(query_files):
+        for dst_path in output_paths([filename], config):
+            dependencies.setdefault(dst_path, list(shared)).append(filename)
+    return dependencies
+
+
+def output_paths(query_files: List[str], config: Config) -> List[str]:
+    """Return the existing outputs of query_files for every target of config"""
+    from .compiler import target_configs  # pylint: disable=import-outside-toplevel
+
+    paths: List[str] = []
+    for target in target_configs(config):
+        if target.get("output_path"):
+            paths.extend(get_output_path(filename, target) for filename in query_files)
+    return [path for path in paths if os.path.exists(path)]
+
+
+def _load_documents(query_files: List[str]) -> List["DocumentNode"]:
+    from graphql.language.parser import parse  # pylint: disable=import-outside-toplevel
+
+    documents = []
+    for filename in query_files:
+        with open(filename, "r", encoding="utf-8") as fp:
+            documents.append(parse(fp.read()))
+    return documents
+
+
+def write_pruned_schema(
+    schema_filepaths: List[str],
+    query_files: List[str],
+    dst_path: str,
+    load_schema: Callable[[], "GraphQLSchema"],
+) -> None:
+    # pylint: disable=import-outside-toplevel
+    from graphql.utilities.print_schema import print_schema
+
+    from .lazy_schema import SchemaIndex, export_pruned_schema
+
+    def export(index: SchemaIndex) -> str:
+        try:
+            return export_pruned_schema(index, documents)
+        finally:
+            index.close()
+
+    def export_full_schema() -> str:
+        index = SchemaIndex()
+        index.add_text(print_schema(load_schema()))
+        return export(index)
+
+    documents = _load_documents(query_files)
+    if all(not path.startswith("http") and not path.endswith(".json") for path in schema_filepaths):
+        try:
+            sdl = export(SchemaIndex.from_files(schema_filepaths))
+        except Exception:  # pylint: disable=broad-except
+            # the definitions of the files could not be indexed, the printed schema always can
+            sdl = export_full_schema()
+    else:
+        sdl = export_full_schema()
+    write_if_changed(dst_path, sdl + "\n")
+
+
+def compile_lazy_schema_library(
+    schema_filepaths: Optional[List[str]], query_files: List[str]
+) -> "GraphQLSchema":
+    from .lazy_schema import build_lazy_schema  # pylint: disable=import-outside-toplevel
+
+    if not schema_filepaths:
+        raise Exception("schema must be required")
+    if any(path.startswith("http") or path.endswith(".json") for path in schema_filepaths):
+        raise Exception("lazy schema loading only supports SDL files")
 
-    return build_ast_schema(parse(full_schema))
+    try:
+        return build_lazy_schema(schema_filepaths, _load_documents(query_files))
+    except Exception:  # pylint: disable=broad-except
+        # the full build reports errors with their details
+        return compile_schema_library(schema_filepaths)
 
 
-def extract_query_files(queries: Optional[List[str]], config: Config) -> List[str]:
-    if not queries:
+def extract_query_files(
+    queries: Optional[List[str]], config: Config, query_list: Optional[str] = None
+) -> List[str]:
+    if not queries and not query_list:
         raise Exception("query file must be required")
 
-    results: Set[str] = set()
-    for pattern in queries:
-        for f_or_d in glob.glob(pattern):
-            if not os.path.exists(f_or_d):
-                continue
-            if os.path.isfile(f_or_d):
-                results.add(f_or_d)
-            if os.path.isdir(f_or_d):
-                results.update(glob.glob(os.path.join(f_or_d, f'**/*.{config["query_ext"]}')))
-    return list(results)
+    return find_query_files(
+        queries or [],
+        config["query_ext"],
+        exclude=config.get("exclude", []),
+        gitignore=config.get("gitignore", False),
+        query_list=query_list,
+    )
+
+
+def shard_query_files(query_files: List[str], index: int, count: int) -> List[str]:
+    """Return the query files of shard index (0 based) out of count.
+
+    Files are assigned largest first to the least loaded shard, so every node computes the same balanced
+    partition from the same checkout.
+    """
+    loads = [0] * count
+    shards: List[List[str]] = [[] for _ in range(count)]
+    sizes = {filename: os.path.getsize(filename) for filename in query_files}
+    for filename in sorted(query_files, key=lambda filename: (-sizes[filename], filename)):
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += sizes[filename]
+        shards[shard].append(filename)
+    return sorted(shards[index])
+
+
+def _parse_shard(ctx, param, value: Optional[str]) -> Optional[Tuple[int, int]]:
+    if value is None:
+        return None
+    try:
+        index, count = (int(v) for v in value.split("/"))
+    except ValueError:
+        raise click.BadParameter("must be in the form of i/n")
+    if not 1 <= index <= count:
+        raise click.BadParameter("i must be between 1 and n")
+    return index - 1, count
+
+
+def project_configs(config: Config) -> List[Tuple[ProjectConfig, Config]]:
+    """Return each project with its config, the top-level keys of config are the defaults of all projects"""
+    base = {key: value for key, value in config.items() if key != "projects"}
+    return [
+        (project, _dict_update(copy.deepcopy(base), project.get("config", {})))
+        for project in config.get("projects", [])
+    ]
 
 
 def load_config_file(config_file_list: List[str]) -> Config:
+    import yaml  # pylint: disable=import-outside-toplevel
+
     config = copy.deepcopy(DEFAULT_CONFIG)
     for config_file in config_file_list:
         with open(config_file) as fp:
@@ -171,11 +502,106 @@ def load_config_file(config_file_list: List[str]) -> Config:
     return config
 
 
+def _project_targets(
+    query: List[str], query_list: Optional[str], config_data: Config, manifest: Optional[str]
+) -> List[Tuple[Config, List[str], Optional[str]]]:
+    """Return (config, query files, manifest) of each project, the command line options make up the only
+    project when the config does not declare projects"""
+    if not config_data.get("projects"):
+        return [(config_data, extract_query_files(query, config_data, query_list=query_list), manifest)]
+    if query or query_list or manifest:
+        raise Exception("-q, --query-list and --manifest are set per project in a config with projects")
+    return [
+        (
+            project_config,
+            extract_query_files(project.get("query"), project_config, query_list=project.get("query_list")),
+            project.get("manifest"),
+        )
+        for project, project_config in project_configs(config_data)
+    ]
+
+
+def _compile_projects(  # pylint: disable=too-many-arguments
+    *,
+    schema: List[str],
+    query: List[str],
+    query_list: Optional[str],
+    config: List[str],
+    config_data: Config,
+    manifest: Optional[str],
+    jobs: int,
+    load_schema: Callable[[], "GraphQLSchema"],
+    lazy_schema: bool,
+    export_schema: Optional[str],
+    depfile: Optional[str],
+    compile_bytecode: bool,
+    optimize: List[int],
+    shard: Optional[Tuple[int, int]],
+    stats: Optional["Stats"],
+    validation_cache: Optional[str],
+) -> None:
+    # pylint: disable=import-outside-toplevel
+    from .compiler import target_configs
+    from .parser import ParsedQuery
+    from .stats import phase
+
+    # (config, query files, manifest) of each project, the command line options make up the only project
+    # when the config does not declare projects
+    targets: List[Tuple[Config, List[str], Optional[str]]]
+    with phase(stats, "discover"):
+        targets = _project_targets(query, query_list, config_data, manifest)
+    if shard:
+        targets = [
+            (target_config, shard_query_files(files, *shard), path) for target_config, files, path in targets
+        ]
+    all_query_files = sorted({filename for _, files, _ in targets for filename in files})
+
+    if export_schema:
+        with phase(stats, "export_schema"):
+            write_pruned_schema(list(schema), all_query_files, export_schema, load_schema)
+        return
+
+    with phase(stats, "schema"):
+        if lazy_schema:
+            compiled_schema = compile_lazy_schema_library(schema, all_query_files)
+        else:
+            compiled_schema = load_schema()
+
+    # the schema and parsed documents are shared by all projects
+    documents: Optional[Dict[str, List[ParsedQuery]]] = {} if len(targets) > 1 else None
+    dependencies: Dict[str, List[str]] = {}
+    for target_config, query_files, manifest_path in targets:
+        changed = run(
+            schema=compiled_schema,
+            query_files=query_files,
+            config=target_config,
+            manifest_path=manifest_path,
+            jobs=jobs,
+            documents=documents,
+            stats=stats,
+            validation_cache=validation_cache,
+        )
+        # each query file has an output for every target with an output_path
+        outputs = sum(1 for target in target_configs(target_config) if target.get("output_path"))
+        click.echo(f"{changed} of {len(query_files) * outputs} generated files changed", err=True)
+        if compile_bytecode:
+            with phase(stats, "bytecode"):
+                bytecode.compile_bytecode(
+                    output_paths(query_files, target_config),
+                    optimize_levels=optimize or (0,),
+                    jobs=jobs,
+                )
+        dependencies.update(collect_dependencies(query_files, list(schema), list(config), target_config))
+    if depfile:
+        with phase(stats, "depfile"):
+            write_depfile(depfile, dependencies)
+
+
 @click.command()
 @click.option(
     "-s",
     "--schema",
-    help="the graphql schemas storage path or url",
+    help="the graphql schemas storage path or url, *.json files are read as introspection results",
     type=str,
     multiple=True,
 )
@@ -186,19 +612,216 @@ def load_config_file(config_file_list: List[str]) -> Config:
     type=str,
     multiple=True,
 )
+@click.option(
+    "--query-list",
+    help="path of a file which lists query files, one per line",
+    type=str,
+)
+@click.option("--exclude", help="glob of query files or directories to skip", type=str, multiple=True)
+@click.option("--gitignore", help="skip query files ignored by .gitignore files", is_flag=True)
 @click.option("-c", "--config", help="path where config yaml file", type=str, multiple=True)
+@click.option(
+    "--manifest",
+    help="path where build manifest is stored, unchanged query files are skipped",
+    type=str,
+    default=None,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="number of worker processes, 0 means the number of cpus",
+    type=int,
+    default=1,
+    show_default=True,
+)
+@click.option("--schema-cache", help="directory where compiled schema snapshots are stored", type=str)
+@click.option(
+    "--validation-cache",
+    help="directory where validation results of query files are stored, unchanged files are not validated",
+    type=str,
+)
+@click.option(
+    "--assume-valid-schema",
+    help="skip schema validation, e.g. for snapshots which were validated when they were written",
+    is_flag=True,
+)
+@click.option(
+    "--introspection-ttl",
+    help="seconds for which a cached introspection result is used without asking the server",
+    type=float,
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--fetch-concurrency",
+    help="maximum number of schemas fetched from network at the same time",
+    type=int,
+    default=8,
+    show_default=True,
+)
+@click.option("--offline", help="use cached introspection results only", is_flag=True)
+@click.option(
+    "--no-descriptions",
+    help="omit descriptions from introspection queries to shrink the response",
+    is_flag=True,
+)
+@click.option(
+    "--lazy-schema",
+    help="build only the part of the schema which is used by the queries, SDL files only",
+    is_flag=True,
+)
+@click.option(
+    "--export-schema",
+    help="write the part of the schema used by the queries to this path instead of generating code",
+    type=str,
+)
+@click.option(
+    "--depfile",
+    help="write the dependencies of the generated files as a Makefile style depfile, or JSON for *.json",
+    type=str,
+)
+@click.option(
+    "--compile-bytecode",
+    help="write __pycache__ bytecode of the generated files, using --jobs processes",
+    is_flag=True,
+)
+@click.option(
+    "--optimize",
+    help="optimization level of the bytecode, can be given more than once",
+    type=click.IntRange(0, 2),
+    multiple=True,
+)
+@click.option(
+    "--shard",
+    help="compile only the i-th of n deterministic partitions of the query files, e.g. 1/4",
+    type=str,
+    callback=_parse_shard,
+)
+@click.option(
+    "--merge-manifest",
+    help="merge the manifests written by shards into --manifest and check for conflicting outputs",
+    type=str,
+    multiple=True,
+)
+@click.option(
+    "--serve",
+    help="keep the schema loaded and serve JSON-RPC compile requests on stdin/stdout",
+    is_flag=True,
+)
+@click.option("--socket", help="serve on this unix socket instead of stdin/stdout", type=str)
+@click.option(
+    "--stats",
+    "stats_path",
+    help="write a JSON report of the time and memory of each phase and file, compiles in one process",
+    type=str,
+)
+@click.option(
+    "--stats-memory",
+    help="trace python allocations of each phase in the --stats report, slows down the run",
+    is_flag=True,
+)
+@click.option("--profile", help="write cProfile statistics of the run to this path", type=str)
+@click.option("-w", "--watch", help="watch schema and query files and recompile on change", is_flag=True)
 @click.version_option(python_graphql_compiler.__version__, "--version")
 def main(
     schema: List[str],
     query: List[str],
+    query_list: Optional[str],
+    exclude: List[str],
+    gitignore: bool,
     config: List[str],
+    manifest: Optional[str],
+    jobs: int,
+    schema_cache: Optional[str],
+    validation_cache: Optional[str],
+    assume_valid_schema: bool,
+    introspection_ttl: float,
+    fetch_concurrency: int,
+    offline: bool,
+    no_descriptions: bool,
+    lazy_schema: bool,
+    export_schema: Optional[str],
+    depfile: Optional[str],
+    compile_bytecode: bool,
+    optimize: List[int],
+    shard: Optional[Tuple[int, int]],
+    merge_manifest: List[str],
+    serve: bool,
+    socket: Optional[str],
+    stats_path: Optional[str],
+    stats_memory: bool,
+    profile: Optional[str],
+    watch: bool,
 ):
-    compiled_schema = compile_schema_library(schema)
-    config_data = load_config_file(config)
-    query_files = extract_query_files(query, config_data)
+    # pylint: disable=import-outside-toplevel
+    from .introspection import IntrospectionOptions
+    from .manifest import merge_manifests
+    from .stats import Stats, profiling
 
-    run(
-        schema=compiled_schema,
-        query_files=query_files,
-        config=config_data,
+    if merge_manifest:
+        if not manifest:
+            raise Exception("--manifest is required to merge manifests")
+        merge_manifests(list(merge_manifest), manifest)
+        return
+
+    config_data = load_config_file(config)
+    if exclude:
+        config_data["exclude"] = config_data.get("exclude", []) + list(exclude)
+    if gitignore:
+        config_data["gitignore"] = True
+    load_schema = functools.partial(
+        compile_schema_library,
+        schema,
+        cache_dir=schema_cache,
+        assume_valid=assume_valid_schema,
+        introspection=IntrospectionOptions(
+            cache_dir=schema_cache,
+            ttl=introspection_ttl,
+            max_concurrency=fetch_concurrency,
+            offline=offline,
+            descriptions=not no_descriptions,
+        ),
     )
+    if config_data.get("projects") and (serve or socket or watch):
+        raise Exception("projects are not supported with --serve and --watch")
+
+    if serve or socket:
+        from .server import CompileServer  # pylint: disable=import-outside-toplevel
+
+        compile_server = CompileServer(load_schema, config_data)
+        if socket:
+            compile_server.serve_unix(socket)
+        else:
+            compile_server.serve_stdio()
+        return
+
+    if watch:
+        from .watch import Watcher  # pylint: disable=import-outside-toplevel
+
+        Watcher(list(schema), list(query), config_data, load_schema=load_schema).watch()
+        return
+
+    stats = Stats(trace_memory=stats_memory) if stats_path else None
+    try:
+        with profiling(profile):
+            _compile_projects(
+                schema=schema,
+                query=query,
+                query_list=query_list,
+                config=config,
+                config_data=config_data,
+                manifest=manifest,
+                jobs=jobs,
+                load_schema=load_schema,
+                lazy_schema=lazy_schema,
+                export_schema=export_schema,
+                depfile=depfile,
+                compile_bytecode=compile_bytecode,
+                optimize=optimize,
+                shard=shard,
+                stats=stats,
+                validation_cache=validation_cache,
+            )
+    finally:
+        if stats and stats_path:
+            stats.write(stats_path)
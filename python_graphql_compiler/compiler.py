@@ -0,0 +1,155 @@
+import json
+
+from collections import OrderedDict
+from typing import ContextManager, Dict, List, Mapping, Optional, Tuple, Union
+
+from graphql import DocumentNode, GraphQLError, GraphQLSchema, build_ast_schema, validate
+from graphql.language import OperationDefinitionNode
+from graphql.language.parser import parse
+
+from .parser import ParsedQuery, Parser
+from .renderer import Renderer
+from .stats import Stats, phase
+from .types import Config
+from .utils import hash_content
+from .validation import validation_rules
+from .validation_cache import ValidationCache
+
+
+def target_configs(config: Config) -> List[Config]:
+    """Return the config of each target, or config itself when it does not declare targets"""
+    if not config.get("targets"):
+        return [config]
+    base = {key: value for key, value in config.items() if key != "targets"}
+    return [{**base, **target} for target in config["targets"]]  # type: ignore
+
+
+class Compiler:
+    """Keeps the schema, the parser and the renderer together so that they can be shared across documents.
+
+    There is a renderer for each target of the config, documents are parsed once for all of them.
+    """
+
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        config: Config,
+        documents: Optional[Dict[str, List[ParsedQuery]]] = None,
+        stats: Optional[Stats] = None,
+        validation_cache: Optional[str] = None,
+    ) -> None:
+        self.schema = schema
+        self.config = config
+        self.parser = Parser(schema)
+        self.targets = target_configs(config)
+        self.renderers = [
+            Renderer(
+                scalar_map=target["scalar_map"],
+                inherit=target["inherit"],
+                python_version=target["python_version"],
+            )
+            for target in self.targets
+        ]
+        self.rules = validation_rules(config.get("validation", "full"))
+        self.rule_names = ",".join(rule.__name__ for rule in self.rules)
+        # parsed documents by hash and rules, shared by compilers of the same schema with different configs
+        self.documents = documents
+        self.stats = stats
+        # nothing to cache when no rule is run
+        self.validation_cache = (
+            ValidationCache(validation_cache, schema, self.rules) if validation_cache and self.rules else None
+        )
+
+    def _phase(self, name: str) -> ContextManager[None]:
+        return phase(self.stats, name)
+
+    def validate(self, query_str: str, document: DocumentNode) -> List[GraphQLError]:
+        if self.validation_cache:
+            return self.validation_cache.validate(query_str, document)
+        return validate(self.schema, document, self.rules)
+
+    def parse_operations(self, query_str: str) -> List[OperationDefinitionNode]:
+        with self._phase("parse"):
+            parsed_query = parse(query_str)
+        with self._phase("validate"):
+            errors = self.validate(query_str, parsed_query)
+        if errors:
+            raise Exception(errors)
+        definitions: List[OperationDefinitionNode] = []
+        for definition in parsed_query.definitions:
+            if isinstance(definition, OperationDefinitionNode):
+                assert definition.name
+                definitions.append(definition)
+            else:
+                raise Exception("Unsupported type found")
+            # elif isinstance(definition, FragmentDefinitionNode):
+            #     assert definition.name
+            #     fragment_library[filename].append(definition)
+        return definitions
+
+    def parse(self, query_str: str) -> List[ParsedQuery]:
+        key = ""
+        parsed_list: Optional[List[ParsedQuery]] = None
+        if self.documents is not None:
+            key = f"{self.rule_names}:{hash_content(query_str)}"
+            parsed_list = self.documents.get(key)
+        if parsed_list is None:
+            definitions = self.parse_operations(query_str)
+            with self._phase("parser"):
+                parsed_list = [self.parser.parse(definition) for definition in definitions]
+            if self.documents is not None:
+                self.documents[key] = parsed_list
+        if self.stats and self.stats.current_file:
+            self.stats.add_operations(self.stats.current_file, len(parsed_list))
+        return parsed_list
+
+    def compile(self, query_str: str) -> Optional[str]:
+        """Render query_str for a config with a single target"""
+        if len(self.renderers) > 1:
+            raise Exception("the config declares several targets, they are rendered by compile_targets")
+        rendered_list = self.compile_targets(query_str)
+        return rendered_list[0] if rendered_list else None
+
+    def compile_targets(self, query_str: str) -> Optional[List[str]]:
+        """Render query_str for every target, in the order of self.targets"""
+        parsed_list = self.parse(query_str)
+        if not parsed_list:
+            return None
+        with self._phase("render"):
+            return [renderer.render(parsed_list) for renderer in self.renderers]
+
+
+MAX_CACHED_COMPILERS = 8
+_compilers: "OrderedDict[Tuple[Union[int, str], str], Compiler]" = OrderedDict()
+
+
+def get_compiler(schema: Union[GraphQLSchema, str], config: Config) -> Compiler:
+    """Return the Compiler shared by all calls with the same schema (object or SDL text) and config"""
+    schema_key = hash_content(schema) if isinstance(schema, str) else id(schema)
+    key = (schema_key, json.dumps(config, sort_keys=True))
+    compiler = _compilers.get(key)
+    if compiler is not None:
+        _compilers.move_to_end(key)
+        return compiler
+
+    if isinstance(schema, str):
+        schema = build_ast_schema(parse(schema))
+    # the compiler keeps a reference to the schema, so its id is not reused while it is cached
+    compiler = Compiler(schema, config)
+    _compilers[key] = compiler
+    if len(_compilers) > MAX_CACHED_COMPILERS:
+        _compilers.popitem(last=False)
+    return compiler
+
+
+def compile_documents(
+    schema: Union[GraphQLSchema, str], config: Config, documents: Mapping[str, str]
+) -> Dict[str, str]:
+    """Compile query texts keyed by name and return the generated module sources keyed by the same names.
+
+    Nothing is read from or written to disk. Documents without operations are left out of the result. The
+    config must not declare several targets.
+    """
+    compiler = get_compiler(schema, config)
+    sources = {name: compiler.compile(query_str) for name, query_str in documents.items()}
+    return {name: source + "\n" for name, source in sources.items() if source is not None}
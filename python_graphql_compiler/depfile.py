@@ -0,0 +1,21 @@
+import json
+import os
+
+from typing import Dict, List
+
+
+def _escape(path: str) -> str:
+    return path.replace("\\", "\\\\").replace(" ", "\\ ").replace("#", "\\#").replace("$", "$$")
+
+
+def write_depfile(path: str, dependencies: Dict[str, List[str]]) -> None:
+    """Write the inputs of every output as a Makefile style depfile, or as JSON when path ends with .json"""
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fp:
+        if path.endswith(".json"):
+            json.dump({"outputs": dependencies}, fp, indent=2, sort_keys=True)
+            return
+        for output, inputs in sorted(dependencies.items()):
+            print(f"{_escape(output)}: {' '.join(_escape(x) for x in inputs)}", file=fp)
@@ -0,0 +1,194 @@
+import fnmatch
+import glob
+import os
+import re
+
+from typing import Iterable, List, Optional, Pattern, Set, Tuple
+
+_MAGIC_RE = re.compile("[*?[]")
+
+# (regex, negate, directories only, directory the .gitignore is in)
+_Rule = Tuple[Pattern[str], bool, bool, str]
+
+
+def _translate(pattern: str) -> str:
+    result = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            result += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            result += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            result += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            result += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            result += "[" + pattern[i + 1 : end].replace("\\", "\\\\").replace("!", "^", 1) + "]"
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            result += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            result += re.escape(pattern[i])
+            i += 1
+    return result
+
+
+def parse_gitignore(path: str) -> List[_Rule]:
+    """Read the rules of a .gitignore file, the common subset of the gitignore syntax is supported"""
+    base = os.path.dirname(path)
+    rules: List[_Rule] = []
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            lines = fp.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        if "/" in line:
+            regex = "^" + _translate(line.lstrip("/")) + "$"
+        else:
+            regex = "^(?:.*/)?" + _translate(line) + "$"
+        rules.append((re.compile(regex), negate, dir_only, base))
+    return rules
+
+
+def is_ignored(rules: List[_Rule], path: str, is_dir: bool) -> bool:
+    ignored = False
+    for regex, negate, dir_only, base in rules:
+        if dir_only and not is_dir:
+            continue
+        relpath = os.path.relpath(path, base).replace(os.sep, "/")
+        if relpath.startswith("../"):
+            continue
+        if regex.match(relpath):
+            ignored = not negate
+    return ignored
+
+
+def _ancestor_rules(directory: str) -> List[_Rule]:
+    """Rules of the .gitignore files above directory, up to the root of the git work tree"""
+    paths: List[str] = []
+    current = os.path.dirname(os.path.abspath(directory))
+    while True:
+        paths.append(os.path.join(current, ".gitignore"))
+        if os.path.exists(os.path.join(current, ".git")):
+            break
+        parent = os.path.dirname(current)
+        if parent == current:
+            return []  # not in a git work tree
+        current = parent
+    return [rule for path in reversed(paths) for rule in parse_gitignore(path)]
+
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _compile_exclude(exclude: Iterable[str]) -> Optional[Pattern[str]]:
+    patterns = [fnmatch.translate(_normalize(pattern)) for pattern in exclude]
+    return re.compile("|".join(patterns)) if patterns else None
+
+
+def _is_excluded(exclude: Optional[Pattern[str]], normalized: str, name: str) -> bool:
+    return exclude is not None and bool(exclude.match(name) or exclude.match(normalized))
+
+
+class QueryFinder:
+    """Finds query files with a single os.scandir pass per directory tree.
+
+    Directories are scanned at most once even when patterns overlap. Hidden entries are skipped like
+    glob does, entries matching one of the exclude globs (by path or by name) are skipped, and with
+    gitignore=True so are the ones ignored by .gitignore files.
+    """
+
+    def __init__(self, query_ext: str, exclude: Iterable[str] = (), gitignore: bool = False) -> None:
+        self.suffix = f".{query_ext}"
+        self.exclude = _compile_exclude(exclude)
+        self.gitignore = gitignore
+        self.visited: Set[str] = set()
+
+    def _walk(
+        self, directory: str, real: str, normalized: str, rules: List[_Rule], results: Set[str]
+    ) -> None:
+        if real in self.visited:
+            return
+        self.visited.add(real)
+        if self.gitignore:
+            rules = rules + parse_gitignore(os.path.join(directory, ".gitignore"))
+
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            is_dir = entry.is_dir()
+            if not is_dir and not entry.name.endswith(self.suffix):
+                continue
+            child = f"{normalized}/{entry.name}"
+            if _is_excluded(self.exclude, child, entry.name):
+                continue
+            if rules and is_ignored(rules, entry.path, is_dir):
+                continue
+            if is_dir:
+                # resolving every directory is costly, only symlinks can lead to a directory seen before
+                child_real = (
+                    os.path.realpath(entry.path) if entry.is_symlink() else f"{real}{os.sep}{entry.name}"
+                )
+                self._walk(entry.path, child_real, child, rules, results)
+            else:
+                results.add(entry.path)
+
+    def find(self, patterns: Iterable[str]) -> List[str]:
+        results: Set[str] = set()
+        for pattern in patterns:
+            paths = glob.glob(pattern, recursive=True) if _MAGIC_RE.search(pattern) else [pattern]
+            for path in paths:
+                normalized = _normalize(path)
+                if _is_excluded(self.exclude, normalized, os.path.basename(normalized)):
+                    continue
+                if os.path.isfile(path):
+                    results.add(path)
+                elif os.path.isdir(path):
+                    rules = _ancestor_rules(path) if self.gitignore else []
+                    if not is_ignored(rules, path, True):
+                        self._walk(path, os.path.realpath(path), normalized, rules, results)
+        return sorted(results)
+
+
+def read_query_list(path: str) -> List[str]:
+    """Read query file paths, one per line, relative paths are relative to the list file"""
+    base = os.path.dirname(path)
+    with open(path, "r", encoding="utf-8") as fp:
+        lines = [line.strip() for line in fp]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+
+
+def find_query_files(
+    patterns: Iterable[str],
+    query_ext: str,
+    exclude: Iterable[str] = (),
+    gitignore: bool = False,
+    query_list: Optional[str] = None,
+) -> List[str]:
+    files = QueryFinder(query_ext, exclude, gitignore).find(patterns)
+    if query_list:
+        files = sorted(set(files).union(read_query_list(query_list)))
+    return files
@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+from typing import Optional
+
+
+def atomic_write(path: str, data: bytes, mode: Optional[int] = None) -> None:
+    """Replace path with data through a unique temporary file in the same directory.
+
+    Readers and concurrent writers see either the previous content or one complete new content, the
+    temporary file is removed when writing fails. mode sets the permission bits of the new file.
+    """
+    dirname = os.path.dirname(path) or "."
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,126 @@
+import concurrent.futures
+import json
+import os
+import time
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from graphql import IntrospectionQuery, get_introspection_query
+
+from .schema_cache import dump_json, load_json
+from .utils import hash_content
+
+
+@dataclass
+class IntrospectionOptions:
+    cache_dir: Optional[str] = None
+    ttl: float = 0
+    offline: bool = False
+    descriptions: bool = True
+    max_concurrency: int = 8
+
+
+def _cache_path(url: str, options: IntrospectionOptions) -> str:
+    assert options.cache_dir
+    key = hash_content(f"{url}\0{options.descriptions}")
+    return os.path.join(options.cache_dir, f"introspection-{key}.json")
+
+
+def fetch_introspection(url: str, options: Optional[IntrospectionOptions] = None) -> IntrospectionQuery:
+    """Post the introspection query to url and return the "data" of the response.
+
+    When a cache directory is given, responses younger than ``ttl`` seconds are reused as is and older ones
+    are revalidated with their ETag.
+    """
+    options = options or IntrospectionOptions()
+    cache_path = _cache_path(url, options) if options.cache_dir else None
+    cached: Optional[Dict[str, Any]] = load_json(cache_path) if cache_path else None
+
+    if options.offline:
+        if not cached:
+            raise Exception(f"no cached introspection result found for {url}")
+        return cached["data"]
+
+    if cached and time.time() - cached["fetched_at"] < options.ttl:
+        return cached["data"]
+
+    try:
+        import requests  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        raise Exception('schema from network unsupported. install "requests"')
+
+    headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip, deflate"}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+
+    res = requests.post(
+        url,
+        headers=headers,
+        data=json.dumps({"query": get_introspection_query(descriptions=options.descriptions)}),
+    )
+    if cached and res.status_code == 304:
+        entry = cached
+    else:
+        res.raise_for_status()
+        entry = {"url": url, "etag": res.headers.get("ETag"), "data": res.json()["data"]}
+
+    if cache_path:
+        entry["fetched_at"] = time.time()
+        dump_json(cache_path, entry)
+    return entry["data"]
+
+
+def fetch_introspections(
+    urls: List[str], options: Optional[IntrospectionOptions] = None
+) -> List[IntrospectionQuery]:
+    """Fetch several introspection results concurrently, the results are in the same order as urls"""
+    options = options or IntrospectionOptions()
+    if len(urls) <= 1:
+        return [fetch_introspection(url, options) for url in urls]
+    max_workers = max(1, min(options.max_concurrency, len(urls)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda url: fetch_introspection(url, options), urls))
+
+
+def load_introspection_file(path: str) -> IntrospectionQuery:
+    with open(path, "r", encoding="utf-8") as fp:
+        data = json.load(fp)
+    # both a raw introspection result and a whole response are accepted
+    return data.get("data", data)
+
+
+def _merge_type(current: Dict[str, Any], other: Dict[str, Any]) -> None:
+    if current["kind"] != other["kind"]:
+        raise Exception(f"type '{current['name']}' is defined as both {current['kind']} and {other['kind']}")
+    for key in ("fields", "inputFields", "enumValues", "interfaces", "possibleTypes"):
+        if other.get(key):
+            items = current.get(key) or []
+            names = {item["name"] for item in items}
+            current[key] = items + [item for item in other[key] if item["name"] not in names]
+
+
+def merge_introspections(introspections: List[IntrospectionQuery]) -> IntrospectionQuery:
+    """Merge introspection results into one, types with the same name are merged field by field"""
+    if len(introspections) == 1:
+        return introspections[0]
+
+    merged: Dict[str, Any] = {"queryType": None, "mutationType": None, "subscriptionType": None}
+    types: Dict[str, Dict[str, Any]] = {}
+    directives: Dict[str, Any] = {}
+    for introspection in introspections:
+        schema: Dict[str, Any] = introspection["__schema"]  # type: ignore
+        for key in ("queryType", "mutationType", "subscriptionType"):
+            if merged[key] is None and schema.get(key):
+                merged[key] = schema[key]
+        for type_ in schema["types"]:
+            if type_["name"] in types:
+                _merge_type(types[type_["name"]], type_)
+            else:
+                types[type_["name"]] = dict(type_)
+        for directive in schema.get("directives") or []:
+            directives.setdefault(directive["name"], directive)
+
+    merged["types"] = list(types.values())
+    merged["directives"] = list(directives.values())
+    return {"__schema": merged}  # type: ignore
@@ -0,0 +1,403 @@
+import copy
+import mmap
+import re
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from graphql import (
+    DirectiveDefinitionNode,
+    DocumentNode,
+    FieldDefinitionNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLSchema,
+    InlineFragmentNode,
+    InputObjectTypeDefinitionNode,
+    InputObjectTypeExtensionNode,
+    InterfaceTypeDefinitionNode,
+    InterfaceTypeExtensionNode,
+    ListTypeNode,
+    NonNullTypeNode,
+    ObjectTypeDefinitionNode,
+    ObjectTypeExtensionNode,
+    OperationDefinitionNode,
+    OperationType,
+    SchemaDefinitionNode,
+    SchemaExtensionNode,
+    SelectionSetNode,
+    TypeNode,
+    UnionTypeDefinitionNode,
+    UnionTypeExtensionNode,
+    build_ast_schema,
+    print_ast,
+)
+from graphql.language import DefinitionNode
+from graphql.language.parser import parse
+
+# tokens of the top level of a document, strings and comments are matched as a whole
+TOKEN_RE = re.compile(rb'"""(?:\\"""|[\s\S])*?"""|"(?:[^"\\\n]|\\.)*"|#[^\r\n]*|[{}()@=|&]|\w+')
+# in braces and parentheses only the brackets matter
+NESTED_RE = re.compile(rb'"""(?:\\"""|[\s\S])*?"""|"(?:[^"\\\n]|\\.)*"|#[^\r\n]*|[{}()]')
+DEFINITION_KEYWORDS = {b"schema", b"scalar", b"type", b"interface", b"union", b"enum", b"input", b"directive"}
+# a keyword which follows one of these tokens is a name, e.g. a member of a union named input
+NAME_CONTEXT = DEFINITION_KEYWORDS | {b"implements", b"on", b"@", b"=", b"|", b"&"}
+
+SCHEMA_KEY = "schema "  # never collides with a type name
+SPECIFIED_SCALARS = {"Int", "Float", "String", "Boolean", "ID"}
+DEFAULT_ROOT_TYPES = {
+    OperationType.QUERY: "Query",
+    OperationType.MUTATION: "Mutation",
+    OperationType.SUBSCRIPTION: "Subscription",
+}
+
+FIELDS_NODES = (
+    ObjectTypeDefinitionNode,
+    ObjectTypeExtensionNode,
+    InterfaceTypeDefinitionNode,
+    InterfaceTypeExtensionNode,
+)
+INPUT_NODES = (InputObjectTypeDefinitionNode, InputObjectTypeExtensionNode)
+UNION_NODES = (UnionTypeDefinitionNode, UnionTypeExtensionNode)
+Chunk = Tuple[Union[bytes, mmap.mmap], int, int]
+
+
+def named_type(type_: TypeNode) -> str:
+    if isinstance(type_, (ListTypeNode, NonNullTypeNode)):
+        return named_type(type_.type)
+    return type_.name.value  # type: ignore
+
+
+def _skip_nested(buffer: Union[bytes, mmap.mmap], pos: int) -> int:
+    """Return the offset after the bracket closing the one before pos"""
+    depth = 1
+    match = NESTED_RE.search(buffer, pos)  # type: ignore
+    while match:
+        bracket = match.group()[:1]
+        if bracket in (b"{", b"("):
+            depth += 1
+        elif bracket in (b"}", b")"):
+            depth -= 1
+            if depth == 0:
+                return match.end()
+        match = NESTED_RE.search(buffer, match.end())  # type: ignore
+    return len(buffer)
+
+
+def scan_definitions(buffer: Union[bytes, mmap.mmap]) -> List[Tuple[int, str, str, List[str]]]:
+    """Return the offset, the kind, the name and the implemented interfaces of each top level definition.
+
+    The offset of a definition is the one of its description or of extend. Bodies in braces and parentheses
+    are skipped, so that fields and arguments named like a keyword do not start a definition.
+    """
+    definitions: List[Tuple[int, str, str, List[str]]] = []
+    start: Optional[int] = None
+    definition_start = 0
+    kind = ""
+    name = ""
+    interfaces: List[str] = []
+    expects_name = False
+    implementing = False
+    previous = b""
+    match = TOKEN_RE.search(buffer)  # type: ignore
+    while match:
+        token = match.group()
+        pos = match.end()
+        if token.startswith(b"#"):
+            match = TOKEN_RE.search(buffer, pos)  # type: ignore
+            continue
+        if token.startswith(b'"') or token == b"extend":
+            # strings of the top level are descriptions
+            start = match.start() if start is None else start
+        elif token in (b"{", b"("):
+            pos = _skip_nested(buffer, pos)
+            expects_name = implementing = False
+        elif token in DEFINITION_KEYWORDS and previous not in NAME_CONTEXT:
+            if kind:
+                definitions.append((definition_start, kind, name, interfaces))
+            definition_start = match.start() if start is None else start
+            kind, name, interfaces = token.decode(), "", []
+            start = None
+            expects_name = kind != "schema"
+            implementing = False
+        elif expects_name:
+            if token == b"@":
+                name = "@"
+            else:
+                name += token.decode()
+                expects_name = False
+        elif token == b"implements":
+            implementing = True
+        elif implementing and token not in (b"&", b"@"):
+            interfaces.append(token.decode())
+        elif token == b"@":
+            implementing = False
+        previous = token
+        match = TOKEN_RE.search(buffer, pos)  # type: ignore
+    if kind:
+        definitions.append((definition_start, kind, name, interfaces))
+    return definitions
+
+
+class SchemaIndex:
+    """Index of the top level definitions in SDL files by their byte offsets.
+
+    Files are memory-mapped and a definition is only parsed when it is looked up.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: Dict[str, List[Chunk]] = {}
+        self._implementers: Dict[str, List[str]] = {}
+        self._nodes: Dict[str, List[DefinitionNode]] = {}
+        self._files: List[mmap.mmap] = []
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> "SchemaIndex":
+        index = cls()
+        for path in paths:
+            index.add_file(path)
+        return index
+
+    def add_file(self, path: str) -> None:
+        with open(path, "rb") as fp:
+            try:
+                buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return
+        self._files.append(buffer)
+        self._scan(buffer)
+
+    def add_text(self, text: str) -> None:
+        self._scan(text.encode("utf-8"))
+
+    def close(self) -> None:
+        for buffer in self._files:
+            buffer.close()
+        self._files = []
+
+    def _scan(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        definitions = scan_definitions(buffer)
+        for i, (start, kind, name, interfaces) in enumerate(definitions):
+            end = definitions[i + 1][0] if i + 1 < len(definitions) else len(buffer)
+            key = SCHEMA_KEY if kind == "schema" else name
+            self._chunks.setdefault(key, []).append((buffer, start, end))
+            for interface in interfaces:
+                self._implementers.setdefault(interface, []).append(name)
+
+    def names(self) -> List[str]:
+        return list(self._chunks)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._chunks
+
+    def get(self, name: str) -> List[DefinitionNode]:
+        """Return the definition and the extensions of name"""
+        nodes = self._nodes.get(name)
+        if nodes is None:
+            nodes = []
+            for buffer, start, end in self._chunks.get(name, []):
+                document = parse(bytes(buffer[start:end]).decode("utf-8"), no_location=True)
+                nodes.extend(document.definitions)
+            self._nodes[name] = nodes
+        return nodes
+
+    def implementers(self, name: str) -> List[str]:
+        return self._implementers.get(name, [])
+
+    def root_types(self) -> Dict[OperationType, str]:
+        root_types = {}
+        for node in self.get(SCHEMA_KEY):
+            for operation_type in node.operation_types:  # type: ignore
+                root_types[operation_type.operation] = operation_type.type.name.value
+        if root_types:
+            return root_types
+        return {operation: name for operation, name in DEFAULT_ROOT_TYPES.items() if name in self}
+
+
+class SchemaPruner:
+    """Collect the parts of the schema reached by a set of query documents"""
+
+    def __init__(self, index: SchemaIndex) -> None:
+        self.index = index
+        # selected field names of object and interface types, None for every other type
+        self.required: Dict[str, Optional[Set[str]]] = {}
+        self.fragments: Dict[str, FragmentDefinitionNode] = {}
+        self.root_types = index.root_types()
+        if OperationType.QUERY in self.root_types:
+            self.require_output(self.root_types[OperationType.QUERY])
+        for name in index.names():
+            if name.startswith("@"):
+                for node in index.get(name):
+                    assert isinstance(node, DirectiveDefinitionNode)
+                    for argument in node.arguments:
+                        self.require_input(named_type(argument.type))
+
+    def _require(self, name: str) -> bool:
+        if name in self.required or name in SPECIFIED_SCALARS or name not in self.index:
+            return False
+        nodes = self.index.get(name)
+        self.required[name] = set() if any(isinstance(node, FIELDS_NODES) for node in nodes) else None
+        return True
+
+    def require_output(self, name: str) -> None:
+        if not self._require(name):
+            return
+        for node in self.index.get(name):
+            if isinstance(node, UNION_NODES):
+                for member in node.types:
+                    self.require_output(member.name.value)
+            elif isinstance(node, (InterfaceTypeDefinitionNode, InterfaceTypeExtensionNode)):
+                for implementer in self.index.implementers(name):
+                    self.require_output(implementer)
+
+    def require_input(self, name: str) -> None:
+        if not self._require(name):
+            return
+        for node in self.index.get(name):
+            if isinstance(node, INPUT_NODES):
+                for field in node.fields:
+                    self.require_input(named_type(field.type))
+
+    def find_field(self, type_name: str, field_name: str) -> Optional[FieldDefinitionNode]:
+        for node in self.index.get(type_name):
+            if isinstance(node, FIELDS_NODES):
+                for field in node.fields:
+                    if field.name.value == field_name:
+                        return field
+        return None
+
+    def add_document(self, document: DocumentNode) -> None:
+        for definition in document.definitions:
+            if isinstance(definition, FragmentDefinitionNode):
+                self.fragments[definition.name.value] = definition
+        for definition in document.definitions:
+            if isinstance(definition, OperationDefinitionNode):
+                for variable in definition.variable_definitions:
+                    self.require_input(named_type(variable.type))
+                root_type = self.root_types.get(definition.operation)
+                if root_type:
+                    self.require_output(root_type)
+                    self.add_selection_set(root_type, definition.selection_set, set())
+
+    def select_field(self, type_name: str, field_name: str) -> Optional[str]:
+        """Mark the field as used and return the name of its type"""
+        field = self.find_field(type_name, field_name)
+        if field is None:  # __typename or an unknown field which is reported by the validation
+            return None
+        selected = self.required.get(type_name)
+        if selected is not None:
+            selected.add(field_name)
+        for argument in field.arguments:
+            self.require_input(named_type(argument.type))
+        field_type = named_type(field.type)
+        self.require_output(field_type)
+        return field_type
+
+    def add_selection_set(self, type_name: str, selection_set: SelectionSetNode, spreads: Set[str]) -> None:
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_type = self.select_field(type_name, selection.name.value)
+                if field_type and selection.selection_set:
+                    self.add_selection_set(field_type, selection.selection_set, spreads)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition.name.value if selection.type_condition else type_name
+                self.require_output(condition)
+                self.add_selection_set(condition, selection.selection_set, spreads)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None or fragment.name.value in spreads:
+                    continue
+                condition = fragment.type_condition.name.value
+                self.require_output(condition)
+                self.add_selection_set(condition, fragment.selection_set, spreads | {fragment.name.value})
+
+    def _placeholder_field(self, type_name: str) -> Optional[str]:
+        fields = [
+            field
+            for node in self.index.get(type_name)
+            if isinstance(node, FIELDS_NODES)
+            for field in node.fields
+        ]
+        for field in fields:
+            if named_type(field.type) in SPECIFIED_SCALARS and not field.arguments:
+                return field.name.value
+        return fields[0].name.value if fields else None
+
+    def _complete(self) -> None:
+        """Add the fields required to keep the pruned schema valid.
+
+        Implementations must provide the used fields of their interfaces and every type needs a field.
+        """
+        changed = True
+        while changed:
+            changed = False
+            for type_name, selected in list(self.required.items()):
+                if selected is None:
+                    continue
+                missing: Set[str] = set()
+                for node in self.index.get(type_name):
+                    if isinstance(node, FIELDS_NODES):
+                        for interface in node.interfaces:
+                            missing |= (self.required.get(interface.name.value) or set()) - selected
+                if not selected and not missing:
+                    placeholder = self._placeholder_field(type_name)
+                    if placeholder:
+                        missing.add(placeholder)
+                for field_name in sorted(missing):
+                    self.select_field(type_name, field_name)
+                    changed = changed or field_name in selected
+
+    def _prune(self, node: DefinitionNode) -> Optional[DefinitionNode]:
+        if isinstance(node, FIELDS_NODES):
+            selected = self.required[node.name.value]
+            node = copy.copy(node)
+            node.fields = tuple(x for x in node.fields if selected is None or x.name.value in selected)
+            node.interfaces = tuple(x for x in node.interfaces if x.name.value in self.required)
+            if isinstance(node, (ObjectTypeExtensionNode, InterfaceTypeExtensionNode)) and not (
+                node.fields or node.interfaces or node.directives
+            ):
+                return None
+        elif isinstance(node, (SchemaDefinitionNode, SchemaExtensionNode)):
+            node = copy.copy(node)
+            node.operation_types = tuple(
+                x for x in node.operation_types if x.type.name.value in self.required
+            )
+            if isinstance(node, SchemaExtensionNode) and not (node.operation_types or node.directives):
+                return None
+        return node
+
+    def document(self) -> DocumentNode:
+        self._complete()
+        definitions: List[DefinitionNode] = []
+        for name in self.index.names():
+            if name in self.required or name == SCHEMA_KEY or name.startswith("@"):
+                for node in self.index.get(name):
+                    pruned = self._prune(node)
+                    if pruned is not None:
+                        definitions.append(pruned)
+        return DocumentNode(definitions=tuple(definitions))
+
+
+def prune_schema(index: SchemaIndex, documents: Iterable[DocumentNode]) -> DocumentNode:
+    pruner = SchemaPruner(index)
+    for document in documents:
+        pruner.add_document(document)
+    return pruner.document()
+
+
+def build_lazy_schema(schema_paths: List[str], documents: Iterable[DocumentNode]) -> GraphQLSchema:
+    """Build a schema which only contains the types and fields reached by documents.
+
+    Interfaces keep all of their implementations and unions all of their members, so the generated code is
+    the same as the one generated with the full schema.
+    """
+    index = SchemaIndex.from_files(schema_paths)
+    try:
+        return build_ast_schema(prune_schema(index, documents), assume_valid=True, assume_valid_sdl=True)
+    finally:
+        index.close()
+
+
+def export_pruned_schema(index: SchemaIndex, documents: Iterable[DocumentNode]) -> str:
+    """Print a minimal but valid SDL which is enough to compile documents"""
+    return print_ast(prune_schema(index, documents))
@@ -0,0 +1,206 @@
+import json
+import os
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import graphql
+
+from graphql import (
+    DocumentNode,
+    GraphQLSchema,
+    NamedTypeNode,
+    OperationDefinitionNode,
+    Visitor,
+    print_ast,
+    visit,
+)
+from graphql.language.parser import parse
+from graphql.utilities.print_schema import print_schema
+
+import python_graphql_compiler
+
+from .files import atomic_write
+from .lazy_schema import SchemaIndex, prune_schema
+from .types import Config
+from .utils import hash_content
+
+MANIFEST_VERSION = 3
+
+
+# the config keys which reach the renderer or the output path, scalar_map is fingerprinted per file
+RENDER_CONFIG_KEYS = ("inherit", "python_version", "output_path", "targets")
+
+
+def hash_config(config: Config) -> str:
+    return hash_content(json.dumps(config, sort_keys=True))
+
+
+def tool_versions() -> Dict[str, str]:
+    """Versions of the packages which generate the code, an upgrade may change the output of any file"""
+    return {"compiler": python_graphql_compiler.__version__, "graphql": graphql.version}
+
+
+class _TypeNameCollector(Visitor):
+    def __init__(self) -> None:
+        super().__init__()
+        self.names: Set[str] = set()
+
+    def enter_named_type(self, node: NamedTypeNode, *_):
+        self.names.add(node.name.value)
+
+
+class DependencyFingerprinter:
+    """Fingerprint of the parts of the schema and the config a query file depends on.
+
+    The fingerprint covers the pruned schema of the file (types, fields, enums, inputs and scalars), the
+    scalar_map entries of the types it uses, the config keys which change the output and the versions of the
+    tools.
+    """
+
+    def __init__(self, schema_sdl: str, config: Config) -> None:
+        self.index = SchemaIndex()
+        self.index.add_text(schema_sdl)
+        self.scalar_map = config["scalar_map"]
+        self.config_base = json.dumps({key: config.get(key) for key in RENDER_CONFIG_KEYS}, sort_keys=True)
+        self.versions = json.dumps(tool_versions(), sort_keys=True)
+
+    def fingerprint(self, document: DocumentNode) -> str:
+        pruned = prune_schema(self.index, [document])
+
+        collector = _TypeNameCollector()
+        visit(pruned, collector)
+        scalars = {name: self.scalar_map[name] for name in sorted(collector.names) if name in self.scalar_map}
+
+        definitions = sorted(print_ast(definition) for definition in pruned.definitions)
+        inputs = [self.config_base, json.dumps(scalars, sort_keys=True), self.versions]
+        return hash_content("\0".join(definitions + inputs))
+
+
+class Manifest:
+    """Records the inputs of the previous build so that unchanged query files can be skipped.
+
+    When the schema or the config changed, an entry is still reused as long as the dependency fingerprint of
+    the file is the same.
+    """
+
+    files: Dict[str, Dict[str, Any]]
+
+    def __init__(self, path: str, schema: GraphQLSchema, config: Config) -> None:
+        self.path = path
+        self.config = config
+        self.schema_sdl = print_schema(schema)
+        self.schema_hash = hash_content(self.schema_sdl)
+        self.config_hash = hash_config(config)
+        self.versions = tool_versions()
+        self.inputs_changed = False
+        self.files = {}
+        self._fingerprinter: Optional[DependencyFingerprinter] = None
+
+    @classmethod
+    def load(cls, path: str, schema: GraphQLSchema, config: Config) -> "Manifest":
+        manifest = cls(path, schema, config)
+        if not os.path.exists(path):
+            return manifest
+        with open(path, "r", encoding="utf-8") as fp:
+            data = json.load(fp)
+        if data.get("version") == MANIFEST_VERSION:
+            manifest.files = data.get("files", {})
+            manifest.inputs_changed = (
+                data.get("schema") != manifest.schema_hash
+                or data.get("config") != manifest.config_hash
+                or any(data.get(key) != version for key, version in manifest.versions.items())
+            )
+        return manifest
+
+    @property
+    def fingerprinter(self) -> DependencyFingerprinter:
+        if self._fingerprinter is None:
+            self._fingerprinter = DependencyFingerprinter(self.schema_sdl, self.config)
+        return self._fingerprinter
+
+    def fingerprint(self, query_str: str) -> str:
+        try:
+            document = parse(query_str, no_location=True)
+        except Exception:  # pylint: disable=broad-except
+            return ""  # never matches, the compile reports the error
+        return self.fingerprinter.fingerprint(document)
+
+    def is_up_to_date(self, filename: str, query_str: str) -> bool:
+        entry = self.files.get(filename)
+        if not entry:
+            return False
+        if entry["hash"] != hash_content(query_str) or not all(map(os.path.exists, entry["outputs"])):
+            return False
+        if self.inputs_changed:
+            return entry.get("deps") == self.fingerprint(query_str)
+        return True
+
+    def update(self, filename: str, query_str: str, outputs: List[str]) -> None:
+        document = parse(query_str, no_location=True)
+        self.files[filename] = {
+            "hash": hash_content(query_str),
+            "deps": self.fingerprinter.fingerprint(document),
+            "outputs": outputs,
+            "operations": [
+                definition.name.value
+                for definition in document.definitions
+                if isinstance(definition, OperationDefinitionNode) and definition.name
+            ],
+        }
+
+    def retain(self, filenames: Iterable[str]) -> None:
+        keep = set(filenames)
+        self.files = {key: value for key, value in self.files.items() if key in keep}
+
+    def save(self) -> None:
+        _dump(
+            self.path,
+            {
+                "version": MANIFEST_VERSION,
+                "schema": self.schema_hash,
+                "config": self.config_hash,
+                **self.versions,
+                "files": dict(sorted(self.files.items())),
+            },
+        )
+
+
+def _dump(path: str, data: Dict[str, Any]) -> None:
+    atomic_write(path, json.dumps(data, indent=2).encode("utf-8"))
+
+
+def merge_manifests(paths: List[str], dst_path: str) -> None:
+    """Merge the manifests written by shards of one build.
+
+    Fails when the shards were built from different inputs or when two shards generate the same output path
+    or the same operation class.
+    """
+    merged: Dict[str, Any] = {}
+    files: Dict[str, Dict[str, Any]] = {}
+    outputs: Dict[str, str] = {}
+    operations: Dict[str, str] = {}
+    conflicts: List[str] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as fp:
+            data = json.load(fp)
+        header = {key: data.get(key) for key in ("version", "schema", "config", *tool_versions())}
+        if merged and header != merged:
+            raise Exception(f"{path} was built from a different schema, config or compiler version")
+        merged = header
+        for filename, entry in data.get("files", {}).items():
+            for output in entry["outputs"]:
+                if outputs.get(output, path) != path:
+                    conflicts.append(f"output '{output}' is generated by {outputs[output]} and {path}")
+                outputs[output] = path
+            for operation in entry.get("operations", []):
+                if operations.get(operation, path) != path:
+                    conflicts.append(
+                        f"class '{operation}' is generated by {operations[operation]} and {path}"
+                    )
+                operations[operation] = path
+            files[filename] = entry
+    if conflicts:
+        raise Exception("\n".join(conflicts))
+
+    merged["files"] = dict(sorted(files.items()))
+    _dump(dst_path, merged)
@@ -0,0 +1,462 @@
+import itertools
+
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, cast
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLField,
+    GraphQLNamedType,
+    GraphQLOutputType,
+    InlineFragmentNode,
+    SelectionSetNode,
+    ValidationContext,
+    ValidationRule,
+    get_named_type,
+    is_object_type,
+    type_from_ast,
+)
+
+# helpers of the reference rule, they are not part of the public api of graphql-core 3.2
+from graphql.validation.rules.overlapping_fields_can_be_merged import (
+    Conflict,
+    NodeAndDef,
+    NodeAndDefCollection,
+    PairSet,
+    collect_fields_and_fragment_names,
+    do_types_conflict,
+    reason_message,
+    stringify_value,
+    subfield_conflicts,
+)
+
+_Selection = Union[SelectionSetNode, FieldNode, InlineFragmentNode, FragmentSpreadNode]
+
+
+def _object_type_id(field: NodeAndDef) -> Optional[int]:
+    """Fields of different object types are mutually exclusive, other parents may overlap with any type"""
+    return id(field[0]) if is_object_type(field[0]) else None
+
+
+def _in_order(
+    pair: Tuple[NodeAndDef, NodeAndDef], positions: Dict[int, int]
+) -> Tuple[NodeAndDef, NodeAndDef]:
+    field1, field2 = pair
+    return pair if positions[id(field1)] < positions[id(field2)] else (field2, field1)
+
+
+class CachedOverlappingFieldsCanBeMergedRule(ValidationRule):
+    """OverlappingFieldsCanBeMergedRule which caches field comparisons.
+
+    The reference rule compares every pair of fields sharing a response name and recurses into their
+    sub-selections, which is quadratic in the number of inline fragments and aliases selecting a field. Here
+    every selection is reduced to a shape id (alias, name, arguments and sub-selections), and comparisons
+    found without conflicts are remembered by shape and type, so each distinct pair is compared once per
+    document. Fields of the same shape and type are compared as a bucket, all pairs are only compared when a
+    representative pair conflicts.
+
+    Valid documents are accepted and invalid ones rejected like the reference rule, with the same messages,
+    but subfield conflicts may be listed in another order and a conflict repeated by identical selections
+    may be reported once.
+    """
+
+    def __init__(self, context: ValidationContext) -> None:
+        super().__init__(context)
+        # field map and fragment names by the id of the selection set, hashing the nodes is costly
+        self.cached_fields_and_fragment_names: Dict[int, Tuple[NodeAndDefCollection, List[str]]] = {}
+        # (id of field map, fragment name) -> mutually exclusive
+        self.compared_fields_and_fragments: Dict[Tuple[int, str], bool] = {}
+        self.compared_fragment_pairs = PairSet()
+        self.shapes: Dict[Any, int] = {}
+        self.node_shapes: Dict[int, int] = {}
+        self.type_keys: Dict[int, str] = {}
+        self.argument_keys: Dict[int, Tuple[Tuple[str, str], ...]] = {}
+        self.cached_buckets: Dict[int, List[List[NodeAndDef]]] = {}
+        # pairs of fields and of selection sets which were compared without conflicts
+        self.clean_fields: Set[Tuple[bool, str, int, str, int]] = set()
+        self.clean_pairs: Set[Tuple[int, int, int, int, bool]] = set()
+
+    def enter_selection_set(self, selection_set: SelectionSetNode, *_args: Any) -> None:
+        conflicts = self.find_conflicts_within_selection_set(self.context.get_parent_type(), selection_set)
+        for (reason_name, reason), fields1, fields2 in conflicts:
+            self.report_error(
+                GraphQLError(
+                    f"Fields '{reason_name}' conflict because {reason_message(reason)}."
+                    " Use different aliases on the fields to fetch both if this was intentional.",
+                    fields1 + fields2,
+                )
+            )
+
+    def argument_key(self, node: FieldNode) -> Tuple[Tuple[str, str], ...]:
+        key = self.argument_keys.get(id(node))
+        if key is None:
+            key = tuple(sorted((arg.name.value, stringify_value(arg.value)) for arg in node.arguments or ()))
+            self.argument_keys[id(node)] = key
+        return key
+
+    def type_key(self, definition: Optional[GraphQLField]) -> str:
+        """The type of a field, wrapping types are created for each field so they are compared by name"""
+        if definition is None:
+            return ""
+        key = self.type_keys.get(id(definition))
+        if key is None:
+            key = self.type_keys[id(definition)] = str(definition.type)
+        return key
+
+    def shape(self, node: _Selection) -> int:
+        """Id shared by structurally equal selections of the document"""
+        shape = self.node_shapes.get(id(node))
+        if shape is not None:
+            return shape
+        key: Any
+        if isinstance(node, SelectionSetNode):
+            key = tuple(self.shape(cast(_Selection, selection)) for selection in node.selections)
+        elif isinstance(node, FieldNode):
+            key = (
+                "field",
+                node.alias.value if node.alias else None,
+                node.name.value,
+                self.argument_key(node),
+                self.shape(node.selection_set) if node.selection_set else None,
+            )
+        elif isinstance(node, InlineFragmentNode):
+            type_name = node.type_condition.name.value if node.type_condition else None
+            key = ("inline", type_name, self.shape(node.selection_set))
+        else:
+            key = ("spread", node.name.value)
+        shape = self.shapes.setdefault(key, len(self.shapes))
+        self.node_shapes[id(node)] = shape
+        return shape
+
+    def fields_and_fragment_names(
+        self, parent_type: Optional[GraphQLNamedType], selection_set: SelectionSetNode
+    ) -> Tuple[NodeAndDefCollection, List[str]]:
+        cached = self.cached_fields_and_fragment_names.get(id(selection_set))
+        if cached is None:
+            field_map: NodeAndDefCollection = {}
+            fragment_names: Dict[str, bool] = {}
+            collect_fields_and_fragment_names(
+                self.context, parent_type, selection_set, field_map, fragment_names
+            )
+            cached = (field_map, list(fragment_names))
+            self.cached_fields_and_fragment_names[id(selection_set)] = cached
+        return cached
+
+    def referenced_fields_and_fragment_names(
+        self, fragment: FragmentDefinitionNode
+    ) -> Tuple[NodeAndDefCollection, List[str]]:
+        cached = self.cached_fields_and_fragment_names.get(id(fragment.selection_set))
+        if cached is not None:
+            return cached
+        fragment_type = type_from_ast(self.context.schema, fragment.type_condition)
+        return self.fields_and_fragment_names(fragment_type, fragment.selection_set)
+
+    def find_conflicts_within_selection_set(
+        self, parent_type: Optional[GraphQLNamedType], selection_set: SelectionSetNode
+    ) -> List[Conflict]:
+        conflicts: List[Conflict] = []
+        field_map, fragment_names = self.fields_and_fragment_names(parent_type, selection_set)
+        self.collect_conflicts_within(conflicts, field_map)
+        for i, fragment_name in enumerate(fragment_names):
+            self.collect_conflicts_between_fields_and_fragment(conflicts, False, field_map, fragment_name)
+            for other_fragment_name in fragment_names[i + 1 :]:
+                self.collect_conflicts_between_fragments(conflicts, False, fragment_name, other_fragment_name)
+        return conflicts
+
+    def collect_conflicts_between_fields_and_fragment(
+        self,
+        conflicts: List[Conflict],
+        are_mutually_exclusive: bool,
+        field_map: NodeAndDefCollection,
+        fragment_name: str,
+    ) -> None:
+        key = (id(field_map), fragment_name)
+        compared = self.compared_fields_and_fragments.get(key)
+        # a comparison which is not mutually exclusive covers the mutually exclusive one
+        if compared is not None and (are_mutually_exclusive or not compared):
+            return
+        self.compared_fields_and_fragments[key] = are_mutually_exclusive
+
+        fragment = self.context.get_fragment(fragment_name)
+        if not fragment:
+            return
+        field_map2, referenced_fragment_names = self.referenced_fields_and_fragment_names(fragment)
+        if field_map is field_map2:
+            return
+        self.collect_conflicts_between(conflicts, are_mutually_exclusive, field_map, field_map2)
+        for referenced_fragment_name in referenced_fragment_names:
+            self.collect_conflicts_between_fields_and_fragment(
+                conflicts, are_mutually_exclusive, field_map, referenced_fragment_name
+            )
+
+    def collect_conflicts_between_fragments(
+        self,
+        conflicts: List[Conflict],
+        are_mutually_exclusive: bool,
+        fragment_name1: str,
+        fragment_name2: str,
+    ) -> None:
+        if fragment_name1 == fragment_name2:
+            return
+        if self.compared_fragment_pairs.has(fragment_name1, fragment_name2, are_mutually_exclusive):
+            return
+        self.compared_fragment_pairs.add(fragment_name1, fragment_name2, are_mutually_exclusive)
+
+        fragment1 = self.context.get_fragment(fragment_name1)
+        fragment2 = self.context.get_fragment(fragment_name2)
+        if not fragment1 or not fragment2:
+            return
+        field_map1, referenced_fragment_names1 = self.referenced_fields_and_fragment_names(fragment1)
+        field_map2, referenced_fragment_names2 = self.referenced_fields_and_fragment_names(fragment2)
+        self.collect_conflicts_between(conflicts, are_mutually_exclusive, field_map1, field_map2)
+        for referenced_fragment_name2 in referenced_fragment_names2:
+            self.collect_conflicts_between_fragments(
+                conflicts, are_mutually_exclusive, fragment_name1, referenced_fragment_name2
+            )
+        for referenced_fragment_name1 in referenced_fragment_names1:
+            self.collect_conflicts_between_fragments(
+                conflicts, are_mutually_exclusive, referenced_fragment_name1, fragment_name2
+            )
+
+    def find_conflicts_between_sub_selection_sets(
+        self,
+        are_mutually_exclusive: bool,
+        parent_type1: Optional[GraphQLNamedType],
+        selection_set1: SelectionSetNode,
+        parent_type2: Optional[GraphQLNamedType],
+        selection_set2: SelectionSetNode,
+    ) -> List[Conflict]:
+        shape1 = self.shape(selection_set1)
+        shape2 = self.shape(selection_set2)
+        key = (id(parent_type1), shape1, id(parent_type2), shape2, are_mutually_exclusive)
+        if key in self.clean_pairs:
+            return []
+
+        conflicts: List[Conflict] = []
+        field_map1, fragment_names1 = self.fields_and_fragment_names(parent_type1, selection_set1)
+        field_map2, fragment_names2 = self.fields_and_fragment_names(parent_type2, selection_set2)
+        self.collect_conflicts_between(conflicts, are_mutually_exclusive, field_map1, field_map2)
+        for fragment_name2 in fragment_names2:
+            self.collect_conflicts_between_fields_and_fragment(
+                conflicts, are_mutually_exclusive, field_map1, fragment_name2
+            )
+        for fragment_name1 in fragment_names1:
+            self.collect_conflicts_between_fields_and_fragment(
+                conflicts, are_mutually_exclusive, field_map2, fragment_name1
+            )
+        for fragment_name1 in fragment_names1:
+            for fragment_name2 in fragment_names2:
+                self.collect_conflicts_between_fragments(
+                    conflicts, are_mutually_exclusive, fragment_name1, fragment_name2
+                )
+
+        if not conflicts:
+            self.clean_pairs.add(key)
+            self.clean_pairs.add((id(parent_type2), shape2, id(parent_type1), shape1, are_mutually_exclusive))
+        return conflicts
+
+    def buckets(self, fields: List[NodeAndDef]) -> List[List[NodeAndDef]]:
+        """fields grouped by return type and shape, the members of a bucket differ only in their parents"""
+        buckets = self.cached_buckets.get(id(fields))
+        if buckets is None:
+            grouped: Dict[Tuple[str, int], List[NodeAndDef]] = {}
+            for field in fields:
+                _, node, definition = field
+                grouped.setdefault((self.type_key(definition), self.shape(node)), []).append(field)
+            buckets = self.cached_buckets[id(fields)] = list(grouped.values())
+        return buckets
+
+    def overlapping_pair(
+        self, bucket1: List[NodeAndDef], bucket2: List[NodeAndDef]
+    ) -> Optional[Tuple[NodeAndDef, NodeAndDef]]:
+        """A pair of fields whose parents may apply at the same time, pairs of one bucket are in order"""
+        first: Dict[int, NodeAndDef] = {}
+        if bucket1 is bucket2:
+            for i, field in enumerate(bucket1):
+                key = _object_type_id(field)
+                if key is None:
+                    return (bucket1[0], field) if i else (field, bucket1[1])
+                if key in first:
+                    return first[key], field
+                first[key] = field
+            return None
+        for field in bucket1:
+            key = _object_type_id(field)
+            if key is None:
+                return field, bucket2[0]
+            first.setdefault(key, field)
+        for field in bucket2:
+            key = _object_type_id(field)
+            if key is None:
+                return bucket1[0], field
+            if key in first:
+                return first[key], field
+        return None
+
+    def exclusive_pair(
+        self, bucket1: List[NodeAndDef], bucket2: List[NodeAndDef]
+    ) -> Optional[Tuple[NodeAndDef, NodeAndDef]]:
+        """A pair of fields of different object types, pairs of one bucket are in order"""
+        objects1 = [field for field in bucket1 if _object_type_id(field) is not None]
+        objects2 = (
+            objects1
+            if bucket1 is bucket2
+            else [field for field in bucket2 if _object_type_id(field) is not None]
+        )
+        if not objects1 or not objects2:
+            return None
+        first = objects1[0]
+        for field in objects2:
+            if _object_type_id(field) != _object_type_id(first):
+                return first, field
+        if bucket1 is not bucket2:
+            # every field of objects2 is of the type of first
+            for field in objects1:
+                if _object_type_id(field) != _object_type_id(first):
+                    return field, objects2[0]
+        return None
+
+    def collect_conflicts_between_buckets(
+        self,
+        conflicts: List[Conflict],
+        parent_fields_are_mutually_exclusive: bool,
+        response_name: str,
+        bucket1: List[NodeAndDef],
+        bucket2: List[NodeAndDef],
+        positions: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """Compare the fields of two buckets, or the fields of one bucket with each other.
+
+        The pairs whose parents are mutually exclusive have the same outcome, and so have the others. One
+        pair of each kind is compared first, the remaining pairs only when one of them conflicts. With the
+        positions of the fields, the fields of a pair are compared in the order of the selection set.
+        """
+        same = bucket1 is bucket2
+        if parent_fields_are_mutually_exclusive:
+            representatives = [(bucket1[0], bucket1[1]) if same else (bucket1[0], bucket2[0])]
+        else:
+            pairs = (self.exclusive_pair(bucket1, bucket2), self.overlapping_pair(bucket1, bucket2))
+            representatives = [pair for pair in pairs if pair]
+        if positions is not None:
+            representatives = [_in_order(pair, positions) for pair in representatives]
+        found = False
+        for field1, field2 in representatives:
+            conflict = self.find_conflict(parent_fields_are_mutually_exclusive, response_name, field1, field2)
+            if conflict:
+                conflicts.append(conflict)
+                found = True
+        if not found:
+            return
+        for pair in itertools.combinations(bucket1, 2) if same else itertools.product(bucket1, bucket2):
+            field1, field2 = pair if positions is None else _in_order(pair, positions)
+            if any(field1 is field3 and field2 is field4 for field3, field4 in representatives):
+                continue
+            conflict = self.find_conflict(parent_fields_are_mutually_exclusive, response_name, field1, field2)
+            if conflict:
+                conflicts.append(conflict)
+
+    def collect_conflicts_within(self, conflicts: List[Conflict], field_map: NodeAndDefCollection) -> None:
+        for response_name, fields in field_map.items():
+            if len(fields) < 2:
+                continue
+            buckets = self.buckets(fields)
+            positions = {id(field): i for i, field in enumerate(fields)}
+            for i, bucket1 in enumerate(buckets):
+                for bucket2 in buckets[i:]:
+                    if bucket1 is not bucket2 or len(bucket1) > 1:
+                        self.collect_conflicts_between_buckets(
+                            conflicts, False, response_name, bucket1, bucket2, positions
+                        )
+
+    def collect_conflicts_between(
+        self,
+        conflicts: List[Conflict],
+        parent_fields_are_mutually_exclusive: bool,
+        field_map1: NodeAndDefCollection,
+        field_map2: NodeAndDefCollection,
+    ) -> None:
+        for response_name, fields1 in field_map1.items():
+            fields2 = field_map2.get(response_name)
+            if not fields2:
+                continue
+            for bucket1 in self.buckets(fields1):
+                for bucket2 in self.buckets(fields2):
+                    self.collect_conflicts_between_buckets(
+                        conflicts, parent_fields_are_mutually_exclusive, response_name, bucket1, bucket2
+                    )
+
+    def find_conflict(
+        self,
+        parent_fields_are_mutually_exclusive: bool,
+        response_name: str,
+        field1: NodeAndDef,
+        field2: NodeAndDef,
+    ) -> Optional[Conflict]:
+        parent_type1 = field1[0]
+        parent_type2 = field2[0]
+        # fields of different object types never apply at the same time, they may differ in name and arguments
+        are_mutually_exclusive = parent_fields_are_mutually_exclusive or (
+            parent_type1 != parent_type2 and is_object_type(parent_type1) and is_object_type(parent_type2)
+        )
+        return self.compare(are_mutually_exclusive, response_name, field1, field2)
+
+    def compare(
+        self, are_mutually_exclusive: bool, response_name: str, field1: NodeAndDef, field2: NodeAndDef
+    ) -> Optional[Conflict]:
+        _, node1, def1 = field1
+        _, node2, def2 = field2
+        type1: Optional[GraphQLOutputType] = def1.type if def1 else None
+        type2: Optional[GraphQLOutputType] = def2.type if def2 else None
+
+        # the outcome depends on the parents only through the mutual exclusion and the field types
+        shape1 = self.shape(node1)
+        shape2 = self.shape(node2)
+        type_key1 = self.type_key(def1)
+        type_key2 = self.type_key(def2)
+        key = (are_mutually_exclusive, type_key1, shape1, type_key2, shape2)
+        if key in self.clean_fields:
+            return None
+        conflict = self._find_conflict(are_mutually_exclusive, response_name, node1, type1, node2, type2)
+        if conflict is None:
+            self.clean_fields.add(key)
+            self.clean_fields.add((are_mutually_exclusive, type_key2, shape2, type_key1, shape1))
+        return conflict
+
+    def _find_conflict(
+        self,
+        are_mutually_exclusive: bool,
+        response_name: str,
+        node1: FieldNode,
+        type1: Optional[GraphQLOutputType],
+        node2: FieldNode,
+        type2: Optional[GraphQLOutputType],
+    ) -> Optional[Conflict]:
+        if not are_mutually_exclusive:
+            name1 = node1.name.value
+            name2 = node2.name.value
+            if name1 != name2:
+                return (response_name, f"'{name1}' and '{name2}' are different fields"), [node1], [node2]
+            if self.argument_key(node1) != self.argument_key(node2):
+                return (response_name, "they have differing arguments"), [node1], [node2]
+
+        if type1 and type2 and do_types_conflict(type1, type2):
+            return (
+                (response_name, f"they return conflicting types '{type1}' and '{type2}'"),
+                [node1],
+                [node2],
+            )
+
+        selection_set1 = node1.selection_set
+        selection_set2 = node2.selection_set
+        if selection_set1 and selection_set2:
+            conflicts = self.find_conflicts_between_sub_selection_sets(
+                are_mutually_exclusive,
+                get_named_type(type1),
+                selection_set1,
+                get_named_type(type2),
+                selection_set2,
+            )
+            return subfield_conflicts(conflicts, response_name, node1, node2)
+        return None
@@ -0,0 +1,114 @@
+import json
+import os
+import pickle
+
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import graphql
+
+from graphql import DocumentNode, GraphQLSchema, validate_schema
+from graphql.language.parser import parse
+
+import python_graphql_compiler
+
+from .files import atomic_write
+from .utils import hash_content
+
+
+def schema_cache_key(full_schema: str) -> str:
+    return hash_content(
+        "\0".join(
+            [python_graphql_compiler.__version__, graphql.version, str(pickle.HIGHEST_PROTOCOL), full_schema]
+        )
+    )
+
+
+def dump_pickle(path: str, obj: object) -> None:
+    """Atomically write a cache entry, concurrent readers see the previous entry or the new one"""
+    atomic_write(path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_pickle(path: str) -> Optional[object]:
+    try:
+        with open(path, "rb") as fp:
+            return pickle.load(fp)
+    except Exception:  # pylint: disable=broad-except
+        # missing, broken or incompatible cache entry, it will be overwritten
+        return None
+
+
+def dump_json(path: str, obj: Any) -> None:
+    """Atomically write a cache entry of plain data, loading it can not run code unlike a pickle"""
+    atomic_write(path, json.dumps(obj).encode("utf-8"))
+
+
+def load_json(path: str) -> Any:
+    try:
+        with open(path, "rb") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        # missing or broken cache entry, it will be overwritten
+        return None
+
+
+def _set_validation_errors(schema: GraphQLSchema, errors: Optional[list]) -> None:
+    # newer graphql-core releases expose validation_errors as a read-only property
+    attr = "_validation_errors" if hasattr(schema, "_validation_errors") else "validation_errors"
+    setattr(schema, attr, errors)
+
+
+def load_schema_snapshot(cache_dir: str, key: str, assume_valid: bool = False) -> Optional[GraphQLSchema]:
+    schema = load_pickle(os.path.join(cache_dir, f"schema-{key}.pickle"))
+    if not isinstance(schema, GraphQLSchema):
+        return None
+    if not assume_valid:
+        # force graphql.validate to check the schema again
+        _set_validation_errors(schema, None)
+    return schema
+
+
+def save_schema_snapshot(cache_dir: str, key: str, schema: GraphQLSchema) -> None:
+    errors = validate_schema(schema)
+    if errors:
+        return
+    try:
+        dump_pickle(os.path.join(cache_dir, f"schema-{key}.pickle"), schema)
+    except (RecursionError, pickle.PicklingError, OSError):
+        # types referencing each other nest deeply in the pickle, such schemas are built again next time
+        pass
+
+
+MAX_MEMORY_DOCUMENTS = 1024
+_documents: "OrderedDict[str, DocumentNode]" = OrderedDict()
+
+
+def parse_schema_document(content_hash: str, content: str, cache_dir: Optional[str] = None) -> DocumentNode:
+    """Parse a SDL file, the result is cached in memory and in cache_dir by the hash of its content.
+
+    Locations are not kept because unpickling them is slower than parsing the file again.
+    """
+    document = _documents.get(content_hash)
+    if document is not None:
+        _documents.move_to_end(content_hash)
+        return document
+
+    path = os.path.join(cache_dir, f"sdl-{schema_cache_key(content_hash)}.pickle") if cache_dir else None
+    loaded = load_pickle(path) if path else None
+    if isinstance(loaded, DocumentNode):
+        document = loaded
+    else:
+        document = parse(content, no_location=True)
+        if path:
+            dump_pickle(path, document)
+
+    _documents[content_hash] = document
+    if len(_documents) > MAX_MEMORY_DOCUMENTS:
+        _documents.popitem(last=False)
+    return document
+
+
+def merge_documents(documents: List[DocumentNode]) -> DocumentNode:
+    if len(documents) == 1:
+        return documents[0]
+    return DocumentNode(definitions=tuple(definition for doc in documents for definition in doc.definitions))
@@ -0,0 +1,152 @@
+import inspect
+import json
+import socketserver
+import sys
+
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from graphql import GraphQLError, GraphQLSchema
+
+from .cli import write_outputs
+from .compiler import Compiler
+from .types import Config
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+COMPILE_ERROR = -32000
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str, data: Any = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+def _error_data(e: Exception) -> Any:
+    errors: List[Any] = e.args[0] if e.args and isinstance(e.args[0], list) else [e]
+    if all(isinstance(error, GraphQLError) for error in errors):
+        return {"errors": [error.formatted for error in errors]}
+    return None
+
+
+class CompileServer:
+    """Serves compile requests over JSON-RPC 2.0, one request per line.
+
+    The schema, the parser and the renderer are built once and kept for the lifetime of the server.
+
+    methods:
+      compile: {"query": text} or {"path": path, "write": bool} -> {"source": text, "output": path}
+        "sources" and "outputs" of the result list every target of the config
+      reload: rebuild the schema -> true
+    """
+
+    def __init__(self, load_schema: Callable[[], GraphQLSchema], config: Config) -> None:
+        self.load_schema = load_schema
+        self.config = config
+        self.compiler = Compiler(load_schema(), config)
+
+    def compile(
+        self, query: Optional[str] = None, path: Optional[str] = None, write: bool = False
+    ) -> Dict[str, Any]:
+        if (query is None) == (path is None):
+            raise RPCError(INVALID_PARAMS, "either query or path must be given")
+        if path is not None:
+            with open(path, "r", encoding="utf-8") as fp:
+                query = fp.read()
+        assert query is not None
+        sources = self.compiler.compile_targets(query) or []
+        outputs: List[str] = []
+        if write and path is not None:
+            outputs, _ = write_outputs(path, sources, self.compiler.targets)
+        return {
+            "source": sources[0] if sources else None,
+            "output": outputs[0] if outputs else None,
+            "sources": sources,
+            "outputs": outputs,
+        }
+
+    def reload(self) -> bool:
+        self.compiler = Compiler(self.load_schema(), self.config)
+        return True
+
+    def dispatch(self, method: str, params: Any) -> Any:
+        if method not in ("compile", "reload"):
+            raise RPCError(METHOD_NOT_FOUND, f"method not found: {method}")
+        func = getattr(self, method)
+        try:
+            if isinstance(params, dict):
+                bound = inspect.signature(func).bind(**params)
+            else:
+                bound = inspect.signature(func).bind(*(params or []))
+        except TypeError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+        return func(*bound.args, **bound.kwargs)
+
+    def handle(self, request: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _response(None, error=RPCError(INVALID_REQUEST, "invalid request"))
+        request_id = request.get("id")
+        try:
+            result = self.dispatch(request["method"], request.get("params"))
+        except RPCError as e:
+            response = _response(request_id, error=e)
+        except Exception as e:  # pylint: disable=broad-except
+            response = _response(request_id, error=RPCError(COMPILE_ERROR, str(e), _error_data(e)))
+        else:
+            response = _response(request_id, result=result)
+        # requests without an id are notifications
+        return response if "id" in request else None
+
+    def handle_line(self, line: str) -> Optional[str]:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps(_response(None, error=RPCError(PARSE_ERROR, str(e))))
+        response = self.handle(request)
+        return json.dumps(response) if response is not None else None
+
+    def serve_stream(self, reader: TextIO, writer: TextIO) -> None:
+        for line in reader:
+            if not line.strip():
+                continue
+            response = self.handle_line(line)
+            if response is not None:
+                writer.write(response + "\n")
+                writer.flush()
+
+    def serve_stdio(self) -> None:  # pragma: no cover
+        self.serve_stream(sys.stdin, sys.stdout)
+
+    def serve_unix(self, path: str) -> None:  # pragma: no cover
+        with make_unix_server(self, path) as server:
+            server.serve_forever()
+
+
+def make_unix_server(compile_server: CompileServer, path: str) -> socketserver.UnixStreamServer:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw in self.rfile:
+                line = raw.decode("utf-8")
+                if not line.strip():
+                    continue
+                response = compile_server.handle_line(line)
+                if response is not None:
+                    self.wfile.write(response.encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+    return socketserver.UnixStreamServer(path, Handler)
+
+
+def _response(request_id: Any, result: Any = None, error: Optional[RPCError] = None) -> Dict[str, Any]:
+    response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id}
+    if error is None:
+        response["result"] = result
+    else:
+        response["error"] = {"code": error.code, "message": error.message}
+        if error.data is not None:
+            response["error"]["data"] = error.data
+    return response
@@ -0,0 +1,121 @@
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from typing import Any, ContextManager, Dict, Iterator, Optional
+
+
+def max_rss() -> Optional[int]:
+    """Peak resident set size of the process in bytes, None where the resource module is not available"""
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:  # windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Stats:
+    """Wall time and peak memory of the compile phases, in total and per query file.
+
+    Phases must not be nested. The time of a phase is attributed to current_file, which the pipeline sets
+    to the file being processed. The peak resident set size of the process is always reported. With
+    trace_memory, Python allocations are traced with tracemalloc as well, per phase and per file where
+    tracemalloc.reset_peak is available (python 3.9+). Tracing slows down every allocation and distorts the
+    times, it is off by default.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.current_file: Optional[str] = None
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.peak_memory = 0
+        self.started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _file(self, filename: str) -> Dict[str, Any]:
+        if filename not in self.files:
+            self.files[filename] = {"time": 0.0, "phases": {}, "operations": 0, "outputs": {}}
+        return self.files[filename]
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        per_phase_memory = self.trace_memory and hasattr(tracemalloc, "reset_peak")
+        if per_phase_memory:
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()  # type: ignore
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            phase = self.phases.setdefault(name, {"time": 0.0, "calls": 0})
+            phase["time"] += elapsed
+            phase["calls"] += 1
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+            self.peak_memory = max(self.peak_memory, peak)
+            if per_phase_memory:
+                phase["peak_memory"] = max(phase.get("peak_memory", 0), peak)
+            if self.current_file is not None:
+                entry = self._file(self.current_file)
+                entry["time"] += elapsed
+                entry["phases"][name] = entry["phases"].get(name, 0.0) + elapsed
+                if per_phase_memory:
+                    entry["peak_memory"] = max(entry.get("peak_memory", 0), peak)
+
+    def add_operations(self, filename: str, count: int) -> None:
+        self._file(filename)["operations"] += count
+
+    def add_output(self, filename: str, path: str, source: str) -> None:
+        lines = source.splitlines()
+        self._file(filename)["outputs"][path] = {
+            "classes": sum(1 for line in lines if line.startswith("class ")),
+            "lines": len(lines),
+            "bytes": len(source.encode("utf-8")),
+        }
+
+    def report(self) -> Dict[str, Any]:
+        if self.trace_memory:
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+        return {
+            "time": time.perf_counter() - self.started,
+            "peak_memory": self.peak_memory if self.trace_memory else None,
+            "max_rss": max_rss(),
+            "phases": self.phases,
+            "files": dict(sorted(self.files.items())),
+        }
+
+    def write(self, path: str) -> None:
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.report(), fp, indent=2)
+
+
+def phase(stats: Optional[Stats], name: str) -> ContextManager[None]:
+    """stats.phase(name), or a no-op when stats are not collected"""
+    return stats.phase(name) if stats else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def profiling(path: Optional[str]) -> Iterator[None]:
+    """Write cProfile statistics of the block to path, or a no-op without path"""
+    if not path:
+        yield
+        return
+    import cProfile  # pylint: disable=import-outside-toplevel
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -1,6 +1,6 @@
 # pylint: disable=inherit-non-class, duplicate-bases
 
-from typing import Dict, List, Literal, TypedDict, Union
+from typing import Any, Dict, List, Literal, TypedDict, Union
 
 ScalarConfig__required = TypedDict("ScalarConfig__required", {"python_type": str})
 ScalarConfig__not_required = TypedDict(
@@ -22,7 +22,28 @@ class InheritConfig(InheritConfig__required, InheritConfig__not_required):
     pass
 
 
-class Config(TypedDict, total=True):
+class ProjectConfig(TypedDict, total=False):
+    name: str
+    query: List[str]
+    query_list: str
+    manifest: str
+    config: Dict[str, Any]
+
+
+class TargetConfig(TypedDict, total=True):
+    python_version: Literal["3.8", "3.9", "3.10"]
+    output_path: str
+
+
+class Config__not_required(TypedDict, total=False):
+    exclude: List[str]
+    gitignore: bool
+    validation: Literal["full", "cached", "fast", "none"]
+    projects: List[ProjectConfig]
+    targets: List[TargetConfig]
+
+
+class Config(Config__not_required, total=True):
     output_path: str
     scalar_map: Dict[str, ScalarConfig]
     query_ext: str
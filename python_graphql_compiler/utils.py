@@ -1,5 +1,8 @@
+import hashlib
 import re
 
+from typing import Union
+
 from graphql import GraphQLSchema, IntrospectionQuery
 from graphql import build_client_schema as build_client_schema_orig
 from graphql.pyutils import inspect
@@ -93,3 +96,9 @@ def build_client_schema(introspection: IntrospectionQuery) -> GraphQLSchema:
 
 def camel_case_to_snake(string: str) -> str:
     return re.sub(r"(?<!^)(?=[A-Z])", "_", string).lower()
+
+
+def hash_content(content: Union[str, bytes]) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
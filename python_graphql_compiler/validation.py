@@ -0,0 +1,39 @@
+from typing import List, Optional, Type
+
+from graphql import ASTValidationRule
+from graphql.validation.rules.no_unused_fragments import NoUnusedFragmentsRule
+from graphql.validation.rules.overlapping_fields_can_be_merged import OverlappingFieldsCanBeMergedRule
+from graphql.validation.specified_rules import specified_rules
+
+CachedOverlappingFieldsCanBeMergedRule: Optional[Type[ASTValidationRule]]
+try:
+    from .overlapping_fields import CachedOverlappingFieldsCanBeMergedRule
+except ImportError:  # the helpers of the reference rule moved, it is used instead
+    CachedOverlappingFieldsCanBeMergedRule = None
+
+VALIDATION_PROFILES = ("full", "cached", "fast", "none")
+
+
+def validation_rules(profile: str = "full") -> List[Type[ASTValidationRule]]:
+    """Rules of a validation profile.
+
+    full: the specified rules except NoUnusedFragments
+    cached: full with the cached overlapping fields check, nested conflicts may be listed in another order
+    fast: full without the overlapping fields check, which is the costliest rule on large selections
+    none: nothing is validated, for corpora which are validated elsewhere
+    """
+    if profile not in VALIDATION_PROFILES:
+        raise Exception(f"unknown validation profile {profile!r}, expected one of {VALIDATION_PROFILES}")
+    if profile == "none":
+        return []
+    rules: List[Type[ASTValidationRule]] = []
+    for rule in specified_rules:
+        if rule is NoUnusedFragmentsRule:
+            continue
+        if rule is OverlappingFieldsCanBeMergedRule:
+            if profile == "fast":
+                continue
+            if profile == "cached" and CachedOverlappingFieldsCanBeMergedRule:
+                rule = CachedOverlappingFieldsCanBeMergedRule
+        rules.append(rule)
+    return rules
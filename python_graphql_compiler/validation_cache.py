@@ -0,0 +1,51 @@
+import os
+
+from typing import Any, List, Optional, Sequence, Tuple, Type
+
+from graphql import ASTValidationRule, DocumentNode, GraphQLError, GraphQLSchema, Source, validate
+from graphql.utilities.print_schema import print_schema
+
+from .schema_cache import dump_json, load_json, schema_cache_key
+from .utils import hash_content
+
+# (message, positions) of each error, an empty list for a valid document
+_Entry = List[Tuple[str, Optional[List[int]]]]
+
+
+class ValidationCache:
+    """Validation results of query documents stored in cache_dir.
+
+    Entries are keyed by the hash of the document text, the schema and the names of the rules, so that an
+    unchanged document is not validated again. Errors are cached as well and rebuilt against the document
+    text, a known bad document fails fast with the same messages and locations.
+    """
+
+    def __init__(
+        self, cache_dir: str, schema: GraphQLSchema, rules: Sequence[Type[ASTValidationRule]]
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.schema = schema
+        self.rules = rules
+        self._schema_hash: Optional[str] = None
+
+    @property
+    def schema_hash(self) -> str:
+        if self._schema_hash is None:
+            self._schema_hash = hash_content(print_schema(self.schema))
+        return self._schema_hash
+
+    def _path(self, query_str: str) -> str:
+        rule_names = ",".join(rule.__name__ for rule in self.rules)
+        key = schema_cache_key("\0".join([self.schema_hash, rule_names, hash_content(query_str)]))
+        return os.path.join(self.cache_dir, f"validation-{key}.json")
+
+    def validate(self, query_str: str, document: DocumentNode) -> List[GraphQLError]:
+        path = self._path(query_str)
+        entry: Any = load_json(path)
+        if isinstance(entry, list):
+            source = Source(query_str)
+            return [GraphQLError(message, source=source, positions=positions) for message, positions in entry]
+
+        errors = validate(self.schema, document, self.rules)
+        dump_json(path, [(error.message, error.positions) for error in errors])
+        return errors
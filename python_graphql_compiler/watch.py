@@ -0,0 +1,83 @@
+import functools
+import os
+import time
+
+from typing import Callable, Dict, List, Optional
+
+import click
+
+from graphql import GraphQLSchema
+
+from .cli import compile_schema_library, extract_query_files, write_outputs
+from .compiler import Compiler
+from .types import Config
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class Watcher:
+    """Polls the schema and query files and recompiles only what changed.
+
+    The compiled schema, the parser and the renderer are kept between polls. The schema is only rebuilt when
+    one of the local schema files is modified.
+    """
+
+    compiler: Optional[Compiler]
+
+    def __init__(
+        self,
+        schema_paths: List[str],
+        queries: List[str],
+        config: Config,
+        load_schema: Optional[Callable[[], GraphQLSchema]] = None,
+    ) -> None:
+        self.schema_paths = schema_paths
+        self.queries = queries
+        self.config = config
+        self.load_schema = load_schema or functools.partial(compile_schema_library, schema_paths)
+        self.compiler = None
+        self.schema_mtimes: Dict[str, Optional[int]] = {}
+        self.query_mtimes: Dict[str, Optional[int]] = {}
+
+    def _schema_changed(self) -> bool:
+        mtimes = {path: _mtime(path) for path in self.schema_paths if not path.startswith("http")}
+        changed = mtimes != self.schema_mtimes
+        self.schema_mtimes = mtimes
+        return changed
+
+    def poll(self) -> List[str]:
+        """Recompile changed query files and return the list of them"""
+        if self._schema_changed() or self.compiler is None:
+            self.compiler = Compiler(self.load_schema(), self.config)
+            self.query_mtimes = {}
+
+        query_files = extract_query_files(self.queries, self.config)
+        mtimes = {filename: _mtime(filename) for filename in query_files}
+        changed = sorted(
+            filename for filename, mtime in mtimes.items() if self.query_mtimes.get(filename) != mtime
+        )
+
+        for filename in changed:
+            try:
+                with open(filename, "r", encoding="utf-8") as fp:
+                    rendered_list = self.compiler.compile_targets(fp.read())
+                if rendered_list is not None:
+                    write_outputs(filename, rendered_list, self.compiler.targets)
+            except Exception as e:  # pylint: disable=broad-except
+                click.echo(f"{filename}: {e}", err=True)
+        self.query_mtimes = mtimes
+        return changed
+
+    def watch(self, interval: float = 0.5) -> None:  # pragma: no cover
+        while True:
+            try:
+                for filename in self.poll():
+                    click.echo(f"compiled {filename}", err=True)
+            except Exception as e:  # pylint: disable=broad-except
+                click.echo(str(e), err=True)
+            time.sleep(interval)
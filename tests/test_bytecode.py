@@ -0,0 +1,36 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from python_graphql_compiler.bytecode import compile_bytecode, is_bytecode_current
+
+
+class Test(unittest.TestCase):
+    def test_compile_bytecode(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = [os.path.join(tmpdir, f"m{i}.py") for i in range(3)]
+            for path in paths:
+                with open(path, "w") as fp:
+                    fp.write('"doc"\nassert True\nVALUE = 1\n')
+
+            self.assertEqual(compile_bytecode(paths, optimize_levels=[0, 2], jobs=2), 6)
+            for path in paths:
+                self.assertTrue(os.path.exists(importlib.util.cache_from_source(path)))
+                self.assertTrue(os.path.exists(importlib.util.cache_from_source(path, optimization=2)))
+                self.assertTrue(is_bytecode_current(path, 0))
+                self.assertFalse(is_bytecode_current(path, 1))
+            self.assertEqual(compile_bytecode(paths, optimize_levels=[0, 2]), 0)
+
+            with open(paths[0], "a") as fp:
+                fp.write("OTHER = 2\n")
+            self.assertFalse(is_bytecode_current(paths[0], 0))
+            self.assertEqual(compile_bytecode(paths), 1)
+
+    def test_compile_error(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "broken.py")
+            with open(path, "w") as fp:
+                fp.write("def (:\n")
+            with self.assertRaises(Exception):
+                compile_bytecode([path])
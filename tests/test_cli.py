@@ -1,11 +1,19 @@
 import inspect
+import json
+import os
 import tempfile
 import unittest
 
+from unittest import mock
+
 # from click.testing import CliRunner
-from graphql import build_ast_schema, parse
+from click.testing import CliRunner
+from graphql import build_ast_schema, get_introspection_query, graphql_sync, parse
+
+import python_graphql_compiler
 
 from python_graphql_compiler import cli
+from python_graphql_compiler.manifest import merge_manifests
 from python_graphql_compiler.types import Config
 
 
@@ -47,9 +55,387 @@ class Test(unittest.TestCase):
 
         # print(out_file.read().decode('utf-8'))
 
+    def test_run_with_manifest(self):
+        schema = build_ast_schema(
+            parse(
+                """
+        type A {
+            id: ID!
+            name: String
+        }
+        type Query {
+            a(id: ID!): A
+        }
+        """
+            )
+        )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_path = os.path.join(tmpdir, "query.graphql")
+            out_path = os.path.join(tmpdir, "query.py")
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            with open(query_path, "w") as fp:
+                fp.write("query Q($id: ID!) { a(id: $id) { id } }")
+
+            config: Config = {
+                "output_path": "{dirname}/{basename_without_ext}.py",
+                "scalar_map": {},
+                "query_ext": "graphql",
+                "inherit": [],
+                "python_version": "3.10",
+            }
+
+            cli.run(schema, [query_path], config, manifest_path=manifest_path)
+            self.assertTrue(os.path.exists(manifest_path))
+            with open(out_path, "w") as fp:
+                fp.write("untouched")
+
+            cli.run(schema, [query_path], config, manifest_path=manifest_path)
+            with open(out_path) as fp:
+                self.assertEqual(fp.read(), "untouched")
+
+            with open(query_path, "w") as fp:
+                fp.write("query Q($id: ID!) { a(id: $id) { id name } }")
+            cli.run(schema, [query_path], config, manifest_path=manifest_path)
+            with open(out_path) as fp:
+                self.assertIn("class Q", fp.read())
+
+            with open(out_path, "w") as fp:
+                fp.write("untouched")
+            config["python_version"] = "3.8"
+            cli.run(schema, [query_path], config, manifest_path=manifest_path)
+            with open(out_path) as fp:
+                self.assertIn("class Q", fp.read())
+
+            # an upgrade of the compiler may change the output of any file
+            with open(out_path, "w") as fp:
+                fp.write("untouched")
+            with mock.patch.object(python_graphql_compiler, "__version__", "999.0.0"):
+                cli.run(schema, [query_path], config, manifest_path=manifest_path)
+            with open(out_path) as fp:
+                self.assertIn("class Q", fp.read())
+
+    def test_run_with_manifest_schema_change(self):
+        schema_str = """
+        scalar Date
+        type A { id: ID! name: String }
+        type B { id: ID! }
+        type Query { a: A b: B }
+        """
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {"Date": {"python_type": "str"}},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            query_files = []
+            for name in ["a", "b"]:
+                query_path = os.path.join(tmpdir, f"{name}.graphql")
+                with open(query_path, "w") as fp:
+                    fp.write(f"query {name.upper()} {{ {name} {{ id }} }}")
+                query_files.append(query_path)
+
+            def compile_and_mark(schema_str):
+                cli.run(build_ast_schema(parse(schema_str)), query_files, config, manifest_path=manifest_path)
+                compiled = []
+                for name in ["a", "b"]:
+                    out_path = os.path.join(tmpdir, f"{name}.py")
+                    with open(out_path) as fp:
+                        if fp.read() != "untouched":
+                            compiled.append(name)
+                    with open(out_path, "w") as fp:
+                        fp.write("untouched")
+                return compiled
+
+            self.assertEqual(compile_and_mark(schema_str), ["a", "b"])
+            schema_str = schema_str.replace("name: String", "name: String date: Date")
+            self.assertEqual(compile_and_mark(schema_str), [])
+            schema_str = schema_str.replace("type B { id: ID! }", "type B { id: Int! }")
+            self.assertEqual(compile_and_mark(schema_str), ["b"])
+            config["scalar_map"]["Date"] = {"python_type": "datetime.date"}
+            self.assertEqual(compile_and_mark(schema_str), [])
+            config["scalar_map"]["Int"] = {"python_type": "int"}
+            self.assertEqual(compile_and_mark(schema_str), ["b"])
+            config["python_version"] = "3.9"
+            self.assertEqual(compile_and_mark(schema_str), ["a", "b"])
+            # keys which do not change the generated source keep the entries
+            config["exclude"] = ["generated"]
+            config["validation"] = "fast"
+            self.assertEqual(compile_and_mark(schema_str), [])
+
+    def test_run_stops_at_invalid_file(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = [os.path.join(tmpdir, f"{name}.graphql") for name in ["a", "b", "c"]]
+            queries = ["query A { a { id } }", "query B { a { x } }", "query C { a { id } }"]
+            for query_file, query in zip(query_files, queries):
+                with open(query_file, "w") as fp:
+                    fp.write(query)
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+
+            with self.assertRaises(Exception):
+                cli.run(schema, query_files, config, manifest_path=manifest_path)
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "a.py")))
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, "c.py")))
+            with open(manifest_path) as fp:
+                self.assertEqual(list(json.load(fp)["files"]), [query_files[0]])
+
+    def test_run_failure_keeps_manifest_consistent(self):
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = [os.path.join(tmpdir, f"{name}.graphql") for name in ["a", "b", "c"]]
+            queries = ["query A { a { id } }", "query B { b { x } }", "query C { c { id } }"]
+            for query_file, query in zip(query_files, queries):
+                with open(query_file, "w") as fp:
+                    fp.write(query)
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            sdl = "type A { id: ID! } type B { x: Int } type C { id: ID! } type Query { a: A b: B c: C }"
+            cli.run(build_ast_schema(parse(sdl)), query_files, config, manifest_path=manifest_path)
+
+            # b becomes invalid and the type of C.id changes, the run stops at b
+            sdl = "type A { id: ID! } type B { y: Int } type C { id: Int! } type Query { a: A b: B c: C }"
+            with self.assertRaises(Exception):
+                cli.run(build_ast_schema(parse(sdl)), query_files, config, manifest_path=manifest_path)
+
+            with open(query_files[1], "w") as fp:
+                fp.write("query B { b { y } }")
+            cli.run(build_ast_schema(parse(sdl)), query_files, config, manifest_path=manifest_path)
+            with open(os.path.join(tmpdir, "c.py")) as fp:
+                self.assertIn("id: int", fp.read())
+
+    def test_run_writes_changed_files_only(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = [os.path.join(tmpdir, f"{name}.graphql") for name in ["a", "b"]]
+            for query_file in query_files:
+                with open(query_file, "w") as fp:
+                    fp.write("query Q { a { id } }")
+            out_path = os.path.join(tmpdir, "a.py")
+
+            self.assertEqual(cli.run(schema, query_files, config), 2)
+            # new outputs get the permissions of any file created by open
+            self.assertEqual(os.stat(out_path).st_mode & 0o777, os.stat(query_files[0]).st_mode & 0o777)
+            os.utime(out_path, ns=(0, 0))
+            os.chmod(out_path, 0o640)
+            self.assertEqual(cli.run(schema, query_files, config), 0)
+            self.assertEqual(os.stat(out_path).st_mtime_ns, 0)
+
+            with open(out_path, "a") as fp:
+                fp.write("# edited")
+            self.assertEqual(cli.run(schema, query_files, config), 1)
+            self.assertNotEqual(os.stat(out_path).st_mtime_ns, 0)
+            self.assertEqual(os.stat(out_path).st_mode & 0o777, 0o640)
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["a.graphql", "a.py", "b.graphql", "b.py"])
+
+    def test_run_targets(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+        config: Config = {
+            "output_path": "",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+            "targets": [
+                {"python_version": "3.8", "output_path": "{dirname}/py38/{basename_without_ext}.py"},
+                {"python_version": "3.10", "output_path": "{dirname}/{basename_without_ext}.py"},
+            ],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_path = os.path.join(tmpdir, "query.graphql")
+            with open(query_path, "w") as fp:
+                fp.write("query Q { a { id } }")
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            outputs = [os.path.join(tmpdir, "py38", "query.py"), os.path.join(tmpdir, "query.py")]
+
+            self.assertEqual(cli.run(schema, [query_path], config, manifest_path=manifest_path), 2)
+            with open(outputs[0]) as fp:
+                self.assertIn("import typing_extensions", fp.read())
+            with open(outputs[1]) as fp:
+                self.assertNotIn("import typing_extensions", fp.read())
+            with open(manifest_path) as fp:
+                self.assertEqual(json.load(fp)["files"][query_path]["outputs"], outputs)
+            self.assertEqual(cli.output_paths([query_path], config), outputs)
+
+            os.unlink(outputs[0])
+            self.assertEqual(cli.run(schema, [query_path], config, manifest_path=manifest_path), 1)
+
+    def test_read_ahead(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = []
+            for i in range(10):
+                filenames.append(os.path.join(tmpdir, f"{i}.graphql"))
+                with open(filenames[-1], "w") as fp:
+                    fp.write(str(i))
+            self.assertEqual(
+                list(cli._read_ahead(filenames, depth=3)), [(f, str(i)) for i, f in enumerate(filenames)]
+            )
+
+    def test_run_parallel(self):
+        schema = build_ast_schema(
+            parse(
+                """
+        enum E { X Y }
+        type A {
+            id: ID!
+            name: String
+            e: E
+        }
+        type Query {
+            a(id: ID!): A
+        }
+        """
+            )
+        )
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = []
+            for i in range(4):
+                query_path = os.path.join(tmpdir, f"query{i}.graphql")
+                with open(query_path, "w") as fp:
+                    fields = " ".join(["id", "e", "name"][: i + 1])
+                    fp.write(f"query Q{i}($id: ID!) {{ a(id: $id) {{ {fields} }} }}")
+                query_files.append(query_path)
+
+            def read_outputs():
+                results = {}
+                for query_path in query_files:
+                    with open(query_path[: -len(".graphql")] + ".py") as fp:
+                        results[query_path] = fp.read()
+                return results
+
+            cli.run(schema, query_files, config)
+            serial = read_outputs()
+            cli.run(schema, query_files, config, jobs=2)
+            self.assertEqual(read_outputs(), serial)
+
+    def test_compile_schema_library_from_introspection_file(self):
+        introspection = graphql_sync(
+            build_ast_schema(parse("type A { id: ID! } type Query { a: A }")), get_introspection_query()
+        ).data
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, "schema.json")
+            with open(json_path, "w") as fp:
+                json.dump({"data": introspection}, fp)
+            sdl_path = os.path.join(tmpdir, "extension.graphql")
+            with open(sdl_path, "w") as fp:
+                fp.write("extend type A { name: String }")
+
+            schema = cli.compile_schema_library([json_path, sdl_path])
+            self.assertEqual(list(schema.type_map["A"].fields), ["id", "name"])  # type: ignore
+
+    def test_collect_dependencies(self):
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = [os.path.join(tmpdir, "a.graphql"), os.path.join(tmpdir, "b.graphql")]
+            with open(os.path.join(tmpdir, "a.py"), "w") as fp:
+                fp.write("")
+
+            dependencies = cli.collect_dependencies(
+                query_files, ["schema.graphql", "http://localhost/graphql"], ["config.yml"], config
+            )
+            self.assertEqual(
+                dependencies,
+                {os.path.join(tmpdir, "a.py"): ["schema.graphql", "config.yml", query_files[0]]},
+            )
+
+    def test_shard_query_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = []
+            for i, size in enumerate([50, 40, 30, 20, 10, 10]):
+                query_files.append(os.path.join(tmpdir, f"q{i}.graphql"))
+                with open(query_files[-1], "w") as fp:
+                    fp.write("#" * size)
+
+            shards = [cli.shard_query_files(list(reversed(query_files)), i, 3) for i in range(3)]
+            self.assertEqual(sorted(sum(shards, [])), sorted(query_files))
+            self.assertEqual(shards[0], [query_files[0], query_files[5]])
+            self.assertEqual(shards[1], [query_files[1], query_files[4]])
+            self.assertEqual(shards[2], [query_files[2], query_files[3]])
+
+    def test_merge_manifests(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = []
+            for name in ["Q1", "Q2", "Q1"]:
+                query_files.append(os.path.join(tmpdir, f"{name}_{len(query_files)}.graphql"))
+                with open(query_files[-1], "w") as fp:
+                    fp.write(f"query {name} {{ a {{ id }} }}")
+            manifests = [os.path.join(tmpdir, f"shard{i}.json") for i in range(3)]
+            for query_file, manifest_path in zip(query_files, manifests):
+                cli.run(schema, [query_file], config, manifest_path=manifest_path)
+
+            merged_path = os.path.join(tmpdir, "manifest.json")
+            merge_manifests(manifests[:2], merged_path)
+            with open(merged_path) as fp:
+                merged = json.load(fp)
+            self.assertEqual(sorted(merged["files"]), sorted(query_files[:2]))
+            self.assertEqual(merged["files"][query_files[0]]["operations"], ["Q1"])
+
+            with self.assertRaisesRegex(Exception, "class 'Q1'"):
+                merge_manifests(manifests, merged_path)
+
     def test_extract_query_files(self):
-        # TODO
-        pass
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+            "exclude": ["generated"],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_files = [os.path.join(tmpdir, "a.graphql"), os.path.join(tmpdir, "x", "y", "b.graphql")]
+            for path in query_files + [os.path.join(tmpdir, "generated", "c.graphql")]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as fp:
+                    fp.write("")
+            self.assertEqual(cli.extract_query_files([tmpdir], config), query_files)
+        with self.assertRaises(Exception):
+            cli.extract_query_files([], config)
 
     def test_load_config_file(self):
         with tempfile.NamedTemporaryFile() as config_file:
@@ -70,6 +456,88 @@ class Test(unittest.TestCase):
                 [{"inherit": "utils.Client[{Input}, {Response}]", "import": "import utils"}],
             )
 
+    def test_main_projects(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write("type A { id: ID! } type Query { a: A }")
+            os.makedirs(os.path.join(tmpdir, "queries"))
+            with open(os.path.join(tmpdir, "queries", "q.graphql"), "w") as fp:
+                fp.write("query Q { a { id } }")
+            config_path = os.path.join(tmpdir, "config.yml")
+            with open(config_path, "w") as fp:
+                fp.write(
+                    inspect.cleandoc(
+                        f"""
+                        python_version: "3.10"
+                        projects:
+                          - name: legacy
+                            query: ["{tmpdir}/queries"]
+                            config:
+                              output_path: "{tmpdir}/legacy/{{basename_without_ext}}.py"
+                              python_version: "3.8"
+                          - name: modern
+                            query: ["{tmpdir}/queries"]
+                            config:
+                              output_path: "{tmpdir}/modern/{{basename_without_ext}}.py"
+                        """
+                    )
+                )
+
+            result = CliRunner().invoke(cli.main, ["-s", schema_path, "-c", config_path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(os.path.join(tmpdir, "legacy", "q.py")) as fp:
+                self.assertIn("import typing_extensions", fp.read())
+            with open(os.path.join(tmpdir, "modern", "q.py")) as fp:
+                self.assertNotIn("import typing_extensions", fp.read())
+
+            query_path = os.path.join(tmpdir, "queries", "q.graphql")
+            result = CliRunner().invoke(cli.main, ["-s", schema_path, "-c", config_path, "-q", query_path])
+            self.assertNotEqual(result.exit_code, 0)
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            args = ["-s", schema_path, "-c", config_path, "--manifest", manifest_path]
+            result = CliRunner().invoke(cli.main, args)
+            self.assertNotEqual(result.exit_code, 0)
+            self.assertFalse(os.path.exists(manifest_path))
+
+    def test_main_targets(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write("type A { id: ID! } type Query { a: A }")
+            query_path = os.path.join(tmpdir, "q.graphql")
+            with open(query_path, "w") as fp:
+                fp.write("query Q { a { id } }")
+            config_path = os.path.join(tmpdir, "config.yml")
+            with open(config_path, "w") as fp:
+                fp.write(
+                    inspect.cleandoc(
+                        """
+                        targets:
+                          - python_version: "3.8"
+                            output_path: "{dirname}/py38/{basename_without_ext}.py"
+                          - python_version: "3.10"
+                            output_path: "{dirname}/{basename_without_ext}.py"
+                        """
+                    )
+                )
+
+            result = CliRunner().invoke(cli.main, ["-s", schema_path, "-c", config_path, "-q", query_path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("2 of 2 generated files changed", result.output)
+
+    def test_project_configs(self):
+        config = cli.load_config_file([])
+        config["projects"] = [
+            {"name": "a", "query": ["a"], "config": {"scalar_map": {"X": {"python_type": "int"}}}}
+        ]
+        ((project, project_config),) = cli.project_configs(config)
+        self.assertEqual(project["name"], "a")
+        self.assertNotIn("projects", project_config)
+        self.assertEqual(project_config["scalar_map"]["X"], {"python_type": "int"})
+        self.assertIn("DateTime", project_config["scalar_map"])
+        self.assertNotIn("X", config["scalar_map"])
+
     def test_main(self):
         pass  # TODO
         # runner = CliRunner()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from graphql import build_ast_schema, parse
+
+from python_graphql_compiler import cli
+from python_graphql_compiler.compiler import Compiler, compile_documents, get_compiler, target_configs
+from python_graphql_compiler.types import Config
+
+SDL = "type A { id: ID! name: String } type Query { a: A }"
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+
+    def test_compile_documents(self):
+        documents = {"a": "query A { a { id } }", "b": "query B { a { name } }"}
+        results = compile_documents(SDL, self.config, documents)
+        self.assertEqual(sorted(results), ["a", "b"])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_path = os.path.join(tmpdir, "a.graphql")
+            with open(query_path, "w") as fp:
+                fp.write(documents["a"])
+            cli.run(build_ast_schema(parse(SDL)), [query_path], self.config)
+            with open(os.path.join(tmpdir, "a.py")) as fp:
+                self.assertEqual(fp.read(), results["a"])
+
+        with self.assertRaises(Exception):
+            compile_documents(SDL, self.config, {"c": "query C { a { unknown } }"})
+
+    def test_get_compiler(self):
+        self.assertIs(get_compiler(SDL, self.config), get_compiler(SDL, dict(self.config)))
+        self.assertIsNot(
+            get_compiler(SDL, self.config), get_compiler(SDL, {**self.config, "python_version": "3.8"})
+        )
+
+        schema = build_ast_schema(parse(SDL))
+        compiler = get_compiler(schema, self.config)
+        self.assertIs(compiler.schema, schema)
+        self.assertIs(get_compiler(schema, self.config), compiler)
+
+    def test_shared_documents(self):
+        schema = build_ast_schema(parse(SDL))
+        documents = {}
+        legacy = Compiler(schema, {**self.config, "python_version": "3.8"}, documents=documents)
+        modern = Compiler(schema, self.config, documents=documents)
+        query = "query A { a { id } }"
+
+        self.assertIn("typing_extensions", legacy.compile(query))
+        self.assertEqual(len(documents), 1)
+        parsed = legacy.parse(query)
+        self.assertIs(modern.parse(query), parsed)
+        self.assertEqual(modern.compile(query), Compiler(schema, self.config).compile(query))
+
+    def test_compile_targets(self):
+        config: Config = {
+            "output_path": self.config["output_path"],
+            "scalar_map": self.config["scalar_map"],
+            "query_ext": self.config["query_ext"],
+            "inherit": self.config["inherit"],
+            "python_version": self.config["python_version"],
+            "targets": [
+                {"python_version": "3.8", "output_path": "py38/{basename_without_ext}.py"},
+                {"python_version": "3.10", "output_path": "{basename_without_ext}.py"},
+            ],
+        }
+        targets = target_configs(config)
+        self.assertEqual([target["python_version"] for target in targets], ["3.8", "3.10"])
+        self.assertNotIn("targets", targets[0])
+        self.assertEqual(target_configs(self.config), [self.config])
+
+        compiler = Compiler(build_ast_schema(parse(SDL)), config)
+        legacy, modern = compiler.compile_targets("query A { a { id } }")
+        self.assertIn("typing_extensions", legacy)
+        self.assertEqual(modern, Compiler(compiler.schema, self.config).compile("query A { a { id } }"))
+        with self.assertRaises(Exception):
+            compiler.compile("query A { a { id } }")
+        with self.assertRaises(Exception):
+            compile_documents(SDL, config, {"a": "query A { a { id } }"})
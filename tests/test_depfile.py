@@ -0,0 +1,27 @@
+import json
+import os
+import tempfile
+import unittest
+
+from python_graphql_compiler.depfile import write_depfile
+
+
+class Test(unittest.TestCase):
+    def test_write_depfile(self):
+        dependencies = {
+            "out/a b.py": ["schema.graphql", "config.yml", "a b.graphql"],
+            "out/c.py": ["c.graphql"],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "deps", "queries.d")
+            write_depfile(path, dependencies)
+            with open(path) as fp:
+                self.assertEqual(
+                    fp.read(),
+                    "out/a\\ b.py: schema.graphql config.yml a\\ b.graphql\nout/c.py: c.graphql\n",
+                )
+
+            path = os.path.join(tmpdir, "queries.json")
+            write_depfile(path, dependencies)
+            with open(path) as fp:
+                self.assertEqual(json.load(fp), {"outputs": dependencies})
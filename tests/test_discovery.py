@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from python_graphql_compiler.discovery import find_query_files, is_ignored, parse_gitignore
+
+
+def _touch(*paths):
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fp:
+            fp.write("")
+
+
+class Test(unittest.TestCase):
+    def test_find_query_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = [
+                os.path.join(tmpdir, *parts)
+                for parts in [("a.graphql",), ("x", "b.graphql"), ("x", "y", "c.graphql")]
+            ]
+            _touch(
+                *files,
+                os.path.join(tmpdir, "x", "d.txt"),
+                os.path.join(tmpdir, "node_modules", "e.graphql"),
+                os.path.join(tmpdir, ".venv", "f.graphql"),
+            )
+
+            self.assertEqual(find_query_files([tmpdir], "graphql", exclude=["node_modules"]), files)
+            # overlapping patterns are scanned once
+            self.assertEqual(
+                find_query_files(
+                    [tmpdir, os.path.join(tmpdir, "x"), os.path.join(tmpdir, "*")],
+                    "graphql",
+                    ["node_modules"],
+                ),
+                files,
+            )
+            self.assertEqual(
+                find_query_files([os.path.join(tmpdir, "**", "c.graphql")], "graphql"), files[2:]
+            )
+            self.assertEqual(
+                find_query_files(
+                    [tmpdir], "graphql", exclude=["node_modules", os.path.join(tmpdir, "x", "y")]
+                ),
+                files[:2],
+            )
+
+            query_list = os.path.join(tmpdir, "queries.txt")
+            with open(query_list, "w") as fp:
+                fp.write("# comment\nnode_modules/e.graphql\n")
+            self.assertEqual(
+                find_query_files([], "graphql", query_list=query_list),
+                [os.path.join(tmpdir, "node_modules", "e.graphql")],
+            )
+
+    def test_gitignore(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, ".git"))
+            with open(os.path.join(tmpdir, ".gitignore"), "w") as fp:
+                fp.write("# comment\nbuild/\n*.generated.graphql\n!keep.generated.graphql\n/src/tmp\n")
+            src = os.path.join(tmpdir, "src")
+            _touch(
+                os.path.join(src, "a.graphql"),
+                os.path.join(src, "a.generated.graphql"),
+                os.path.join(src, "keep.generated.graphql"),
+                os.path.join(src, "build", "b.graphql"),
+                os.path.join(src, "tmp", "c.graphql"),
+                os.path.join(src, "sub", "tmp", "d.graphql"),
+                os.path.join(src, "sub", "e.graphql"),
+            )
+            with open(os.path.join(src, "sub", ".gitignore"), "w") as fp:
+                fp.write("e.graphql\n")
+
+            self.assertEqual(
+                find_query_files([src], "graphql", gitignore=True),
+                [
+                    os.path.join(src, "a.graphql"),
+                    os.path.join(src, "keep.generated.graphql"),
+                    os.path.join(src, "sub", "tmp", "d.graphql"),
+                ],
+            )
+            self.assertEqual(len(find_query_files([src], "graphql")), 7)
+
+    def test_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, ".gitignore")
+            with open(path, "w") as fp:
+                fp.write("a/**/b\n**/c\nd?[0-9]\n")
+            rules = parse_gitignore(path)
+            self.assertTrue(is_ignored(rules, os.path.join(tmpdir, "a", "b"), False))
+            self.assertTrue(is_ignored(rules, os.path.join(tmpdir, "a", "x", "y", "b"), False))
+            self.assertFalse(is_ignored(rules, os.path.join(tmpdir, "x", "a", "b"), False))
+            self.assertTrue(is_ignored(rules, os.path.join(tmpdir, "x", "c"), True))
+            self.assertTrue(is_ignored(rules, os.path.join(tmpdir, "dx1"), False))
+            self.assertFalse(is_ignored(rules, os.path.join(tmpdir, "dxy"), False))
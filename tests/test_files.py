@@ -0,0 +1,26 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from python_graphql_compiler.files import atomic_write
+
+
+class Test(unittest.TestCase):
+    def test_atomic_write(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sub", "a.json")
+            atomic_write(path, b"1")
+            atomic_write(path, b"2", mode=0o640)
+            with open(path, "rb") as fp:
+                self.assertEqual(fp.read(), b"2")
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+            with mock.patch("os.replace", side_effect=OSError("replace failed")):
+                with self.assertRaises(OSError):
+                    atomic_write(path, b"3")
+            # the temporary file is removed and the previous content is kept
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["a.json"])
+            with open(path, "rb") as fp:
+                self.assertEqual(fp.read(), b"2")
@@ -0,0 +1,149 @@
+import http.server
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+from typing import Any, Dict, List, Tuple
+
+from graphql import build_ast_schema, get_introspection_query, graphql_sync, parse
+
+from python_graphql_compiler.introspection import (
+    IntrospectionOptions,
+    fetch_introspection,
+    fetch_introspections,
+    merge_introspections,
+)
+from python_graphql_compiler.utils import build_client_schema
+
+SCHEMA = build_ast_schema(parse('type Query { "the a" a: String }'))
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    requests: List[Tuple[Dict[str, str], Any]] = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((dict(self.headers), body))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        result = graphql_sync(SCHEMA, body["query"])
+        data = json.dumps({"data": result.data}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *_):
+        pass
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        Handler.requests = []
+        self.server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/graphql"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_without_cache(self):
+        data = fetch_introspection(self.url)
+        self.assertEqual(data["__schema"]["queryType"]["name"], "Query")
+        self.assertIn("gzip", Handler.requests[0][0]["Accept-Encoding"])
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaises(Exception):
+                fetch_introspection(self.url, IntrospectionOptions(cache_dir=tmpdir, offline=True))
+
+            options = IntrospectionOptions(cache_dir=tmpdir)
+            data = fetch_introspection(self.url, options)
+            self.assertEqual(len(Handler.requests), 1)
+
+            self.assertEqual(fetch_introspection(self.url, options), data)
+            self.assertEqual(len(Handler.requests), 2)
+            self.assertEqual(Handler.requests[1][0]["If-None-Match"], '"v1"')
+
+            options = IntrospectionOptions(cache_dir=tmpdir, ttl=3600)
+            self.assertEqual(fetch_introspection(self.url, options), data)
+            self.assertEqual(len(Handler.requests), 2)
+
+            self.server.shutdown()
+            options = IntrospectionOptions(cache_dir=tmpdir, offline=True)
+            self.assertEqual(fetch_introspection(self.url, options), data)
+
+    def test_no_descriptions(self):
+        data = fetch_introspection(self.url, IntrospectionOptions(descriptions=False))
+        self.assertNotIn("description", Handler.requests[0][1]["query"])
+        query_type = [t for t in data["__schema"]["types"] if t["name"] == "Query"][0]
+        self.assertNotIn("description", query_type["fields"][0])
+
+
+class SlowHandler(http.server.BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.lock:
+            SlowHandler.active += 1
+            SlowHandler.max_active = max(SlowHandler.max_active, SlowHandler.active)
+        time.sleep(0.1 if self.path == "/0" else 0.05)
+        with self.lock:
+            SlowHandler.active -= 1
+        schema = build_ast_schema(parse(f"type Query {{ field{self.path[1:]}: String }}"))
+        data = json.dumps({"data": graphql_sync(schema, body["query"]).data}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *_):
+        pass
+
+
+class ConcurrentTest(unittest.TestCase):
+    def test_fetch_introspections(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            urls = [f"http://127.0.0.1:{server.server_port}/{i}" for i in range(4)]
+            results = fetch_introspections(urls, IntrospectionOptions(max_concurrency=2))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(SlowHandler.max_active, 2)
+        for i, result in enumerate(results):
+            query_type = [t for t in result["__schema"]["types"] if t["name"] == "Query"][0]
+            self.assertEqual(query_type["fields"][0]["name"], f"field{i}")
+
+
+class MergeTest(unittest.TestCase):
+    def test_merge_introspections(self):
+        def introspect(sdl):
+            return graphql_sync(build_ast_schema(parse(sdl)), get_introspection_query()).data
+
+        merged = merge_introspections(
+            [
+                introspect("enum E { X } type A { id: ID! } type Query { a: A e: E }"),
+                introspect("enum E { Y } type B { id: ID! } type Query { b: B }"),
+            ]
+        )
+        schema = build_client_schema(merged)
+        self.assertEqual(list(schema.query_type.fields), ["a", "e", "b"])  # type: ignore
+        self.assertEqual(list(schema.type_map["E"].values), ["X", "Y"])  # type: ignore
+        self.assertIn("B", schema.type_map)
+
+        with self.assertRaises(Exception):
+            merge_introspections([introspect("type Query { a: Int }"), introspect("input Query { a: Int }")])
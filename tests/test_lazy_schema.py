@@ -0,0 +1,242 @@
+import functools
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from graphql import build_ast_schema, parse, print_ast, validate_schema
+
+from python_graphql_compiler import cli
+from python_graphql_compiler.compiler import Compiler
+from python_graphql_compiler.lazy_schema import (
+    SchemaIndex,
+    build_lazy_schema,
+    export_pruned_schema,
+    prune_schema,
+)
+from python_graphql_compiler.types import Config
+
+SCHEMA_STR = '''
+"""scalar description"""
+scalar MyScalar
+enum Episode { NEWHOPE EMPIRE JEDI }
+input SubInput { age: Int }
+input AddInput { name: String! sub: SubInput }
+type A {
+  id: ID!
+  name: String
+  episode: Episode!
+  r: SearchResult
+}
+union SearchResult = Human | Droid | Starship
+interface Character {
+  id: ID!
+  name: String!
+}
+"""
+type Human is not a definition
+"""
+type Human implements Character {
+  id: ID!
+  name: String!
+  totalCredits: Int!
+}
+type Droid implements Character {
+  id: ID!
+  name: String!
+  friends: [Character]
+  primaryFunction: String!
+}
+type Starship { id: ID! name: String! }
+type Unused { id: ID! }
+type Query {
+  a(id: ID!): A
+  hero: Character
+  unused: Unused
+}
+type Mutation {
+  add(input: AddInput!): A
+}
+extend type Query {
+  extra(x: MyScalar): A
+}
+directive @my(x: SubInput) on FIELD
+'''
+
+# fields and descriptions starting with keywords at the start of a line
+KEYWORDS_SCHEMA_STR = '''
+type Item implements Node & Named @key(fields: "type") {
+id: ID!
+type: String
+input(scalar: Int): Int
+}
+"""
+Description of a node,
+input values are not definitions
+"""
+interface Node { id: ID! }
+# type Commented
+interface Named { name: String }
+type Query { item: Item }
+'''
+
+QUERY_STR = """
+query Q1($id: ID!) {
+  a(id: $id) {
+    id episode
+    r { __typename ... on Human { name } ... on Starship { id } }
+  }
+}
+query Q2 { hero { __typename id ... on Droid { primaryFunction friends { name } } } }
+mutation M($input: AddInput!) { add(input: $input) { id } }
+query Q3 { extra(x: "x") { name } }
+"""
+
+
+class Test(unittest.TestCase):
+    def test_index(self):
+        index = SchemaIndex()
+        index.add_text(SCHEMA_STR)
+        self.assertEqual(
+            index.names(),
+            [
+                "MyScalar",
+                "Episode",
+                "SubInput",
+                "AddInput",
+                "A",
+                "SearchResult",
+                "Character",
+                "Human",
+                "Droid",
+                "Starship",
+                "Unused",
+                "Query",
+                "Mutation",
+                "@my",
+            ],
+        )
+        self.assertEqual(index.implementers("Character"), ["Human", "Droid"])
+        self.assertEqual(len(index.get("Query")), 2)
+
+    def test_index_keywords_in_bodies(self):
+        index = SchemaIndex()
+        index.add_text(KEYWORDS_SCHEMA_STR)
+        self.assertEqual(index.names(), ["Item", "Node", "Named", "Query"])
+        self.assertEqual(index.implementers("Node"), ["Item"])
+        self.assertEqual(index.implementers("Named"), ["Item"])
+        self.assertEqual(len(index.get("Item")[0].fields), 3)  # type: ignore
+        description = index.get("Node")[0].description.value  # type: ignore
+        self.assertEqual(description, "Description of a node,\ninput values are not definitions")
+
+    def test_prune_schema(self):
+        index = SchemaIndex()
+        index.add_text(SCHEMA_STR)
+        pruned = build_ast_schema(prune_schema(index, [parse(QUERY_STR)]))
+
+        self.assertNotIn("Unused", pruned.type_map)
+        self.assertEqual(set(pruned.query_type.fields), {"a", "hero", "extra"})  # type: ignore
+        self.assertEqual(validate_schema(pruned), [])
+        self.assertEqual(set(pruned.type_map["Human"].fields), {"id", "name"})  # type: ignore
+        self.assertEqual(set(pruned.type_map["Starship"].fields), {"id"})  # type: ignore
+        self.assertEqual(set(pruned.type_map["Character"].fields), {"id", "name"})  # type: ignore
+        self.assertIn("SubInput", pruned.type_map)
+        self.assertIn("type Human implements Character", print_ast(prune_schema(index, [parse(QUERY_STR)])))
+
+    def test_same_output(self):
+        config: Config = {
+            "output_path": "",
+            "scalar_map": {"MyScalar": {"python_type": "str"}},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write(SCHEMA_STR)
+            lazy = build_lazy_schema([schema_path], [parse(QUERY_STR)])
+
+        full = build_ast_schema(parse(SCHEMA_STR))
+        self.assertEqual(Compiler(lazy, config).compile(QUERY_STR), Compiler(full, config).compile(QUERY_STR))
+
+    def test_compile_lazy_schema_library(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write(SCHEMA_STR)
+            query_path = os.path.join(tmpdir, "query.graphql")
+            with open(query_path, "w") as fp:
+                fp.write("query Q { hero { id } }")
+
+            schema = cli.compile_lazy_schema_library([schema_path], [query_path])
+            self.assertNotIn("Unused", schema.type_map)
+
+            with open(query_path, "w") as fp:
+                fp.write("query Q { hero { id }")
+            schema = cli.compile_lazy_schema_library([schema_path], [query_path])
+            self.assertIn("Unused", schema.type_map)
+
+    def test_export_pruned_schema(self):
+        index = SchemaIndex()
+        index.add_text(SCHEMA_STR)
+        sdl = export_pruned_schema(index, [parse("query Q { hero { name } }")])
+        schema = build_ast_schema(parse(sdl))
+        self.assertEqual(validate_schema(schema), [])
+        self.assertEqual(set(schema.type_map["Droid"].fields), {"name"})  # type: ignore
+        self.assertNotIn("Mutation", schema.type_map)
+        self.assertNotIn("AddInput", schema.type_map)
+
+    def test_write_pruned_schema(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write(SCHEMA_STR)
+            query_path = os.path.join(tmpdir, "query.graphql")
+            with open(query_path, "w") as fp:
+                fp.write(QUERY_STR)
+            dst_path = os.path.join(tmpdir, "pruned.graphql")
+
+            load_schema = functools.partial(cli.compile_schema_library, [schema_path])
+            cli.write_pruned_schema([schema_path], [query_path], dst_path, load_schema)
+            pruned = cli.compile_schema_library([dst_path])
+            self.assertNotIn("Unused", pruned.type_map)
+
+            config: Config = {
+                "output_path": "",
+                "scalar_map": {"MyScalar": {"python_type": "str"}},
+                "query_ext": "graphql",
+                "inherit": [],
+                "python_version": "3.10",
+            }
+            full = cli.compile_schema_library([schema_path])
+            self.assertEqual(
+                Compiler(pruned, config).compile(QUERY_STR), Compiler(full, config).compile(QUERY_STR)
+            )
+
+    def test_write_pruned_schema_fallback(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write(SCHEMA_STR)
+            query_path = os.path.join(tmpdir, "query.graphql")
+            with open(query_path, "w") as fp:
+                fp.write(QUERY_STR)
+            dst_path = os.path.join(tmpdir, "pruned.graphql")
+
+            # a definition of the files can not be parsed, the loaded schema is pruned instead
+            get = SchemaIndex.get
+            failures = [Exception("syntax error")]
+
+            def get_once(index, name):
+                if failures:
+                    raise failures.pop()
+                return get(index, name)
+
+            load_schema = functools.partial(cli.compile_schema_library, [schema_path])
+            with mock.patch.object(SchemaIndex, "get", autospec=True, side_effect=get_once):
+                cli.write_pruned_schema([schema_path], [query_path], dst_path, load_schema)
+            pruned = cli.compile_schema_library([dst_path])
+            self.assertNotIn("Unused", pruned.type_map)
+            self.assertIn("extra", pruned.query_type.fields)  # type: ignore
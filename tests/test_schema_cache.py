@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from graphql import build_ast_schema, parse
+from graphql.utilities.print_schema import print_schema
+
+from python_graphql_compiler import cli, schema_cache
+from python_graphql_compiler.utils import hash_content
+
+
+class Test(unittest.TestCase):
+    def test_snapshot(self):
+        schema = build_ast_schema(parse("type Query { a: String }"))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            key = schema_cache.schema_cache_key("type Query { a: String }")
+            self.assertIsNone(schema_cache.load_schema_snapshot(tmpdir, key))
+
+            schema_cache.save_schema_snapshot(tmpdir, key, schema)
+            loaded = schema_cache.load_schema_snapshot(tmpdir, key)
+            assert loaded
+            self.assertEqual(print_schema(loaded), print_schema(schema))
+            self.assertIsNone(loaded.validation_errors)
+
+            loaded = schema_cache.load_schema_snapshot(tmpdir, key, assume_valid=True)
+            assert loaded
+            self.assertEqual(loaded.validation_errors, [])
+
+            with open(os.path.join(tmpdir, f"schema-{key}.pickle"), "wb") as fp:
+                fp.write(b"broken")
+            self.assertIsNone(schema_cache.load_schema_snapshot(tmpdir, key))
+
+    def test_compile_schema_library(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            cache_dir = os.path.join(tmpdir, "cache")
+            with open(schema_path, "w") as fp:
+                fp.write("type Query { a: String }")
+
+            def snapshots():
+                return [name for name in os.listdir(cache_dir) if name.startswith("schema-")]
+
+            schema = cli.compile_schema_library([schema_path], cache_dir=cache_dir)
+            self.assertEqual(len(snapshots()), 1)
+            cached = cli.compile_schema_library([schema_path], cache_dir=cache_dir)
+            self.assertEqual(print_schema(cached), print_schema(schema))
+
+            with open(schema_path, "w") as fp:
+                fp.write("type Query { a: String b: Int }")
+            changed = cli.compile_schema_library([schema_path], cache_dir=cache_dir)
+            self.assertIn("b", changed.query_type.fields)  # type: ignore
+            self.assertEqual(len(snapshots()), 2)
+
+    def test_compile_schema_library_connected_schema(self):
+        # the graph of these types is too deep to be pickled, the snapshot is skipped
+        types = " ".join(
+            f"type T{i} {{ id: ID! a: T{(i + 1) % 100} b: T{(i * 7) % 100} c: T{(i * 13 + 5) % 100} }}"
+            for i in range(100)
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            cache_dir = os.path.join(tmpdir, "cache")
+            with open(schema_path, "w") as fp:
+                fp.write(f"{types} type Query {{ t: T0 }}")
+
+            for _ in range(2):
+                schema = cli.compile_schema_library([schema_path], cache_dir=cache_dir)
+                self.assertIn("T99", schema.type_map)
+            self.assertFalse([name for name in os.listdir(cache_dir) if name.startswith("schema-")])
+
+    def test_parse_schema_document(self):
+        content = "type A { id: ID! }"
+        content_hash = hash_content(content)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            document = schema_cache.parse_schema_document(content_hash, content, cache_dir=tmpdir)
+            self.assertIs(schema_cache.parse_schema_document(content_hash, content), document)
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+
+            schema_cache._documents.clear()
+            loaded = schema_cache.parse_schema_document(content_hash, content, cache_dir=tmpdir)
+            self.assertIsNot(loaded, document)
+            self.assertEqual(loaded, document)
+
+    def test_merge_documents(self):
+        merged = schema_cache.merge_documents([parse("type A { id: ID! }"), parse("type Query { a: A }")])
+        self.assertEqual([definition.name.value for definition in merged.definitions], ["A", "Query"])
+        build_ast_schema(merged)
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from graphql import build_ast_schema, parse
+
+from python_graphql_compiler.server import CompileServer, make_unix_server
+from python_graphql_compiler.types import Config
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        self.loads = 0
+
+    def load_schema(self):
+        self.loads += 1
+        return build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+
+    def request(self, server, method, params=None, request_id=1):
+        return json.loads(
+            server.handle_line(
+                json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+            )
+        )
+
+    def test_compile(self):
+        server = CompileServer(self.load_schema, self.config)
+        response = self.request(server, "compile", {"query": "query Q { a { id } }"})
+        self.assertIn("class QResponse:", response["result"]["source"])
+        self.assertIsNone(response["result"]["output"])
+
+        response = self.request(server, "compile", {"query": "query Q { a { name } }"})
+        self.assertEqual(response["error"]["code"], -32000)
+        self.assertEqual(len(response["error"]["data"]["errors"]), 1)
+
+        response = self.request(server, "compile", {"query": "query Q {"})
+        self.assertEqual(response["error"]["code"], -32000)
+        self.assertIn("Syntax Error", response["error"]["data"]["errors"][0]["message"])
+
+        self.assertEqual(self.request(server, "compile", {})["error"]["code"], -32602)
+        self.assertEqual(self.request(server, "compile", {"unknown": 1})["error"]["code"], -32602)
+        self.assertEqual(self.request(server, "unknown")["error"]["code"], -32601)
+        self.assertEqual(json.loads(server.handle_line("{"))["error"]["code"], -32700)
+        self.assertIsNone(server.handle_line(json.dumps({"jsonrpc": "2.0", "method": "reload"})))
+        self.assertEqual(self.loads, 2)
+
+    def test_compile_path(self):
+        server = CompileServer(self.load_schema, self.config)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_path = os.path.join(tmpdir, "query.graphql")
+            with open(query_path, "w") as fp:
+                fp.write("query Q { a { id } }")
+            response = self.request(server, "compile", {"path": query_path, "write": True})
+            self.assertEqual(response["result"]["output"], os.path.join(tmpdir, "query.py"))
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "query.py")))
+
+    def test_serve_stream(self):
+        server = CompileServer(self.load_schema, self.config)
+        reader = io.StringIO(
+            "\n".join(
+                json.dumps({"jsonrpc": "2.0", "id": i, "method": "compile", "params": {"query": query}})
+                for i, query in enumerate(["query Q { a { id } }", "query R { a { id } }"])
+            )
+        )
+        writer = io.StringIO()
+        server.serve_stream(reader, writer)
+        responses = [json.loads(line) for line in writer.getvalue().splitlines()]
+        self.assertEqual([response["id"] for response in responses], [0, 1])
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "unix socket is not supported")
+    def test_unix_socket(self):
+        server = CompileServer(self.load_schema, self.config)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "server.sock")
+            with make_unix_server(server, path) as unix_server:
+                thread = threading.Thread(target=unix_server.serve_forever)
+                thread.start()
+                try:
+                    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                        sock.connect(path)
+                        request = {
+                            "jsonrpc": "2.0",
+                            "id": 1,
+                            "method": "compile",
+                            "params": ["query Q { a { id } }"],
+                        }
+                        sock.sendall(json.dumps(request).encode() + b"\n")
+                        response = json.loads(sock.makefile("rb").readline())
+                    self.assertIn("class QResponse:", response["result"]["source"])
+                finally:
+                    unix_server.shutdown()
+                    thread.join()
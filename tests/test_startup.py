@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# microseconds, generous because CI machines are noisy; importing everything takes ~10x this
+IMPORT_TIME_BUDGET = 150_000
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+
+
+def _import_time(stderr: str, module: str) -> int:
+    for line in stderr.splitlines():
+        columns = line.split("|")
+        if len(columns) == 3 and columns[2].strip() == module:
+            return int(columns[1])
+    raise AssertionError(f"{module} is not imported")
+
+
+class Test(unittest.TestCase):
+    def test_cli_import_is_lazy(self):
+        result = _run(
+            "import json, sys\n"
+            "import python_graphql_compiler.cli\n"
+            "print(json.dumps([m for m in ('graphql', 'requests', 'yaml') if m in sys.modules]))"
+        )
+        self.assertEqual(json.loads(result.stdout), [])
+
+    def test_cli_import_time(self):
+        elapsed = min(
+            _import_time(_run("import python_graphql_compiler.cli").stderr, "python_graphql_compiler.cli")
+            for _ in range(3)
+        )
+        self.assertLess(elapsed, IMPORT_TIME_BUDGET)
+
+    def test_local_schema_does_not_import_requests(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write("type Query { a: String }")
+            result = _run(
+                "import sys\n"
+                "from python_graphql_compiler import cli\n"
+                f"cli.compile_schema_library([{schema_path!r}])\n"
+                "print('requests' in sys.modules)"
+            )
+        self.assertEqual(result.stdout.strip(), "False")
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from click.testing import CliRunner
+from graphql import build_ast_schema, parse
+
+from python_graphql_compiler import cli
+from python_graphql_compiler.stats import Stats, phase
+from python_graphql_compiler.types import Config
+
+
+class Test(unittest.TestCase):
+    def test_phase(self):
+        stats = Stats(trace_memory=False)
+        with phase(stats, "a"):
+            pass
+        stats.current_file = "x.graphql"
+        with phase(stats, "a"):
+            pass
+        with phase(None, "a"):
+            pass
+        report = stats.report()
+        self.assertEqual(report["phases"]["a"]["calls"], 2)
+        self.assertEqual(list(report["files"]["x.graphql"]["phases"]), ["a"])
+        self.assertIsNone(report["peak_memory"])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_run(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A b: A }"))
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            query_path = os.path.join(tmpdir, "query.graphql")
+            with open(query_path, "w") as fp:
+                fp.write("query Q { a { id } }\nquery R { b { id } }")
+            stats = Stats(trace_memory=True)
+            self.addCleanup(tracemalloc.stop)
+            self.assertEqual(cli.run(schema, [query_path], config, stats=stats), 1)
+            stats_path = os.path.join(tmpdir, "stats", "stats.json")
+            stats.write(stats_path)
+            with open(stats_path) as fp:
+                report = json.load(fp)
+
+            for name in ("read", "parse", "validate", "parser", "render", "write"):
+                self.assertIn(name, report["phases"])
+            self.assertGreater(report["peak_memory"], 0)
+            entry = report["files"][query_path]
+            self.assertEqual(entry["operations"], 2)
+            output = entry["outputs"][os.path.join(tmpdir, "query.py")]
+            with open(os.path.join(tmpdir, "query.py")) as fp:
+                source = fp.read()
+            self.assertEqual(output["lines"], len(source.splitlines()))
+            self.assertEqual(output["bytes"], len(source.encode("utf-8")))
+            self.assertEqual(output["classes"], source.count("\nclass "))
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write("type A { id: ID! } type Query { a: A }")
+            query_dir = os.path.join(tmpdir, "queries")
+            os.makedirs(query_dir)
+            with open(os.path.join(query_dir, "q.graphql"), "w") as fp:
+                fp.write("query Q { a { id } }")
+            stats_path = os.path.join(tmpdir, "stats.json")
+            profile_path = os.path.join(tmpdir, "profile.prof")
+
+            result = CliRunner().invoke(
+                cli.main,
+                ["-s", schema_path, "-q", query_dir, "--stats", stats_path, "--profile", profile_path],
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(stats_path) as fp:
+                report = json.load(fp)
+            self.assertIn("discover", report["phases"])
+            # memory is not traced unless --stats-memory is given
+            self.assertIsNone(report["peak_memory"])
+            self.assertGreater(report["max_rss"], 0)
+            self.assertIn("schema", report["phases"])
+            self.assertEqual(report["files"][os.path.join(query_dir, "q.graphql")]["operations"], 1)
+            self.assertTrue(os.path.getsize(profile_path))
+
+            self.addCleanup(tracemalloc.stop)
+            result = CliRunner().invoke(
+                cli.main, ["-s", schema_path, "-q", query_dir, "--stats", stats_path, "--stats-memory"]
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(stats_path) as fp:
+                self.assertGreater(json.load(fp)["peak_memory"], 0)
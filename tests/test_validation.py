@@ -0,0 +1,86 @@
+import unittest
+
+from graphql import build_ast_schema, parse, validate
+from graphql.validation.rules.overlapping_fields_can_be_merged import OverlappingFieldsCanBeMergedRule
+
+from python_graphql_compiler.compiler import Compiler
+from python_graphql_compiler.validation import CachedOverlappingFieldsCanBeMergedRule, validation_rules
+
+SCHEMA = """
+interface Node { id: ID! }
+type A implements Node { id: ID! name: String n: Int child: Node kids(first: Int): [Node] }
+type B implements Node { id: ID! name: Int n: Int child: Node kids(first: Int): [Node!] }
+type Query { node(id: ID): Node nodes: [Node] }
+"""
+
+
+class Test(unittest.TestCase):
+    def test_validation_rules(self):
+        full = validation_rules("full")
+        self.assertIn(OverlappingFieldsCanBeMergedRule, full)
+        cached = validation_rules("cached")
+        self.assertIn(CachedOverlappingFieldsCanBeMergedRule, cached)
+        self.assertNotIn(OverlappingFieldsCanBeMergedRule, cached)
+        self.assertEqual(len(cached), len(full))
+        fast = validation_rules("fast")
+        self.assertNotIn(OverlappingFieldsCanBeMergedRule, fast)
+        self.assertEqual(len(fast), len(full) - 1)
+        self.assertEqual(validation_rules("none"), [])
+        with self.assertRaises(Exception):
+            validation_rules("strict")
+
+        schema = build_ast_schema(parse(SCHEMA))
+        config = {"scalar_map": {}, "inherit": [], "python_version": "3.10", "validation": "fast"}
+        self.assertEqual(Compiler(schema, config).rules, fast)
+
+    def test_shared_documents(self):
+        schema = build_ast_schema(parse(SCHEMA))
+        config = {"scalar_map": {}, "inherit": [], "python_version": "3.10"}
+        documents = {}
+        query = "query Q { node(id: 1) { __typename ... on A { x: id x: name } } }"
+        Compiler(schema, {**config, "validation": "none"}, documents=documents).parse(query)
+        # a document parsed without validation is not reused by a compiler which validates it
+        with self.assertRaises(Exception):
+            Compiler(schema, {**config, "validation": "full"}, documents=documents).parse(query)
+
+    def test_overlapping_fields(self):
+        schema = build_ast_schema(parse(SCHEMA))
+        queries = [
+            "{ node { id ... on A { id name } ... on B { id name } } }",
+            "{ node { x: id x: id ... on A { x: id } } }",
+            "{ node { x: id x: n } }",
+            "{ node { ... on A { x: name } ... on B { x: n } } }",
+            "{ node { ... on A { name } ... on B { name } } }",
+            "{ node { ... on A { kids(first: 1) { id } } ... on A { kids(first: 2) { id } } } }",
+            "{ node { ... on A { kids(first: 1) { id } } ... on B { kids(first: 2) { id } } } }",
+            "{ node { ...F ...G } } fragment F on A { x: name } fragment G on A { x: id }",
+            "{ a: node { ...F } a: node { ...G } } fragment F on Node { x: id } fragment G on Node { x: id }",
+            "{ a: node { ...F } a: node { ...G } } fragment F on Node { x: id } fragment G on A { x: name }",
+            "{ node { child { ... on A { c: child { id } } } child { ... on A { c: child { x: id } } } } }",
+            "{ node { child { ... on A { c: child { id } } } child { ... on A { c: child { id: n } } } } }",
+        ]
+        for query in queries:
+            document = parse(query)
+            expected = validate(schema, document, [OverlappingFieldsCanBeMergedRule])
+            errors = validate(schema, document, [CachedOverlappingFieldsCanBeMergedRule])
+            self.assertEqual([e.formatted for e in errors], [e.formatted for e in expected], query)
+
+    def test_overlapping_fields_large(self):
+        types = " ".join(f"type T{i} implements Node {{ id: ID! child: Node }}" for i in range(100))
+        schema = build_ast_schema(
+            parse(f"interface Node {{ id: ID! }} {types} type Query {{ nodes: [Node] }}")
+        )
+        fragments = " ".join(f"... on T{i} {{ id child {{ id ... on T{i} {{ id }} }} }}" for i in range(100))
+        document = parse(f"{{ nodes {{ {fragments} }} nodes {{ {fragments} }} }}")
+        self.assertEqual(validate(schema, document, [CachedOverlappingFieldsCanBeMergedRule]), [])
+
+        document = parse(
+            f"{{ nodes {{ {fragments} }} nodes {{ {fragments} ... on T3 {{ id: child {{ id }} }} }} }}"
+        )
+        errors = validate(schema, document, [CachedOverlappingFieldsCanBeMergedRule])
+        expected = validate(schema, document, [OverlappingFieldsCanBeMergedRule])
+        # subfield conflicts may be listed in another order
+        self.assertEqual(
+            sorted(e.message.split(" because ")[0] for e in errors),
+            sorted(e.message.split(" because ")[0] for e in expected),
+        )
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from graphql import build_ast_schema, parse
+from graphql.validation.specified_rules import specified_rules
+
+from python_graphql_compiler import validation_cache
+from python_graphql_compiler.compiler import Compiler
+from python_graphql_compiler.validation_cache import ValidationCache
+
+
+class Test(unittest.TestCase):
+    def test_validate(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+        valid = "query Q { a { id } }"
+        invalid = "query Q {\n  a { name }\n}"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ValidationCache(tmpdir, schema, specified_rules)
+            self.assertEqual(cache.validate(valid, parse(valid)), [])
+            errors = cache.validate(invalid, parse(invalid))
+            self.assertEqual(len(errors), 1)
+            self.assertEqual(len(os.listdir(tmpdir)), 2)
+            self.assertTrue(all(name.endswith(".json") for name in os.listdir(tmpdir)))
+
+            cache = ValidationCache(tmpdir, schema, specified_rules)
+            with mock.patch.object(validation_cache, "validate") as validate:
+                self.assertEqual(cache.validate(valid, parse(valid)), [])
+                cached_errors = cache.validate(invalid, parse(invalid))
+                validate.assert_not_called()
+            self.assertEqual([e.formatted for e in cached_errors], [e.formatted for e in errors])
+            self.assertEqual(cached_errors[0].locations[0].line, 2)
+
+            # another schema or rule set does not reuse the entries
+            other = build_ast_schema(parse("type A { id: ID! name: String } type Query { a: A }"))
+            self.assertEqual(
+                ValidationCache(tmpdir, other, specified_rules).validate(invalid, parse(invalid)), []
+            )
+            ValidationCache(tmpdir, schema, specified_rules[:1]).validate(valid, parse(valid))
+            self.assertEqual(len(os.listdir(tmpdir)), 4)
+
+    def test_compiler(self):
+        schema = build_ast_schema(parse("type A { id: ID! } type Query { a: A }"))
+        config = {"scalar_map": {}, "inherit": [], "python_version": "3.10"}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = Compiler(schema, config, validation_cache=tmpdir).compile("query Q { a { id } }")
+            with mock.patch.object(validation_cache, "validate") as validate:
+                compiler = Compiler(schema, config, validation_cache=tmpdir)
+                self.assertEqual(compiler.compile("query Q { a { id } }"), source)
+                validate.assert_not_called()
+                with self.assertRaises(Exception):
+                    compiler.compile("query Q { b }")
+                validate.assert_called_once()
+
+            # validation: none reads and writes nothing
+            none_dir = os.path.join(tmpdir, "none")
+            compiler = Compiler(schema, {**config, "validation": "none"}, validation_cache=none_dir)
+            self.assertEqual(compiler.compile("query Q { a { id } }"), source)
+            self.assertFalse(os.path.exists(none_dir))
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from python_graphql_compiler.types import Config
+from python_graphql_compiler.watch import Watcher
+
+
+class Test(unittest.TestCase):
+    def test_poll(self):
+        config: Config = {
+            "output_path": "{dirname}/{basename_without_ext}.py",
+            "scalar_map": {},
+            "query_ext": "graphql",
+            "inherit": [],
+            "python_version": "3.10",
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schema_path = os.path.join(tmpdir, "schema.graphql")
+            with open(schema_path, "w") as fp:
+                fp.write("type Query { a: String b: String }")
+            query_paths = []
+            for name in ["a", "b"]:
+                query_path = os.path.join(tmpdir, f"{name}.graphql")
+                with open(query_path, "w") as fp:
+                    fp.write(f"query {name.upper()} {{ {name} }}")
+                query_paths.append(query_path)
+
+            watcher = Watcher([schema_path], query_paths, config)
+            self.assertEqual(watcher.poll(), query_paths)
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "a.py")))
+            compiler = watcher.compiler
+
+            self.assertEqual(watcher.poll(), [])
+
+            with open(query_paths[0], "w") as fp:
+                fp.write("query A { a b }")
+            os.utime(query_paths[0], ns=(0, 0))
+            self.assertEqual(watcher.poll(), [query_paths[0]])
+            self.assertIs(watcher.compiler, compiler)
+
+            with open(schema_path, "w") as fp:
+                fp.write("type Query { a: String b: String c: String }")
+            os.utime(schema_path, ns=(0, 0))
+            self.assertEqual(watcher.poll(), query_paths)
+            self.assertIsNot(watcher.compiler, compiler)